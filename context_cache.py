@@ -0,0 +1,96 @@
+"""
+Gemini context caching for the static part of the script prompt.
+
+Everything in SCRIPT_GENERATOR_PROMPT.md except today's date and the recent
+concepts is identical from one call to the next, so it's uploaded once as a
+cached-content resource and each script call only sends the small dynamic
+suffix. Caches are found again by display name — "pip-script-<variant>-<hash
+of model + static text>" — so any run, on any machine, reuses the same one;
+when the prompt file changes the hash changes, a new cache is created and the
+old one is deleted.
+
+Google Search grounding has to live in the cache rather than the request, so
+the grounded and plain configs each get their own cache ("variant").
+"""
+
+import hashlib
+import os
+import threading
+
+from google.genai import types
+
+# Default for GEMINI_CONTEXT_CACHE_TTL_HOURS. Refreshed on every use, so a
+# daily run keeps the same cache alive
+TTL_HOURS = 26
+DISPLAY_PREFIX = "pip-script"
+
+_names = {}  # display name -> cache resource name (None = unavailable)
+_lock = threading.Lock()
+
+
+def _find_or_create(client, model, static_text, tools, variant, display_name):
+    ttl_hours = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL_HOURS", TTL_HOURS))
+    ttl = f"{int(ttl_hours * 3600)}s"
+    found = None
+    for cache in client.caches.list():
+        name = cache.display_name or ""
+        if not name.startswith(f"{DISPLAY_PREFIX}-{variant}-"):
+            continue
+        if name == display_name and found is None:
+            found = cache
+        else:
+            # An older version of the prompt (or a duplicate): retire it
+            client.caches.delete(name=cache.name)
+            print(f"✓ Deleted outdated context cache {name}")
+
+    if found:
+        client.caches.update(
+            name=found.name, config=types.UpdateCachedContentConfig(ttl=ttl)
+        )
+        print(f"↺ Reusing context cache {display_name}")
+        return found.name
+
+    cache = client.caches.create(
+        model=model,
+        config=types.CreateCachedContentConfig(
+            display_name=display_name,
+            contents=[static_text],
+            tools=tools,
+            ttl=ttl,
+        ),
+    )
+    print(f"✓ Created context cache {display_name}")
+    return cache.name
+
+
+def cached_content_name(client, model, static_text, variant, tools=None):
+    """
+    The cached-content resource holding `static_text` (and `tools`) for this
+    model, creating it if needed.
+
+    Returns:
+        str: the resource name, or None if caching is off or unavailable —
+             callers then send the full prompt as before
+    """
+    if os.getenv("GEMINI_CONTEXT_CACHE", "1") != "1":
+        return None
+    digest = hashlib.sha256(f"{model}\n{static_text}".encode("utf-8")).hexdigest()
+    display_name = f"{DISPLAY_PREFIX}-{variant}-{digest[:16]}"
+    with _lock:
+        if display_name not in _names:
+            try:
+                _names[display_name] = _find_or_create(
+                    client, model, static_text, tools, variant, display_name
+                )
+            except Exception as e:
+                print(f"⚠️  Context cache unavailable ({e}); sending the full prompt.")
+                _names[display_name] = None
+        return _names[display_name]
+
+
+def forget(name):
+    """Stop using a cache that failed (e.g. expired); later calls go uncached."""
+    with _lock:
+        for display_name, cached in _names.items():
+            if cached == name:
+                _names[display_name] = None
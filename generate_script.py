@@ -3,26 +3,42 @@
 Daily script generation for Pip's Projects.
 
 Sends SCRIPT_GENERATOR_PROMPT.md to Gemini (Vertex AI, authenticated via the
-service account in GOOGLE_APPLICATION_CREDENTIALS) along with the log of past
-concepts (content_history.json) so today's idea is never a repeat. Gemini is
-given Google Search grounding so it can factor in current holidays, the season,
-and trending short-form content.
+service account in GOOGLE_APPLICATION_CREDENTIALS) along with the recent
+concepts from the concept history (history/); the result is then checked against the
+whole history by the local novelty index (novelty.py) and regenerated if it is
+a near-repeat. Gemini is given Google Search grounding so it can factor in
+current holidays, the season, and trending short-form content.
+
+With --batch (or SCRIPT_BATCH=1), a week of dated scripts is requested in one
+call and appended to script_queue.json instead; generate_video.py takes from
+that queue in date order.
 
 Outputs:
   - pending_script.json   (consumed by generate_video.py)
-  - content_history.json  (appended with today's concept for future novelty checks)
+  - script_queue.json     (batch mode only)
+  - history/<month>.jsonl (appended with today's concept for future novelty checks)
 """
 
 import json
 import os
+import queue
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from pathlib import Path
 
 from google import genai
 from google.genai import types
 
+import context_cache
+import history_store
+import novelty
+import response_cache
+import script_queue
+
 try:
     from dotenv import load_dotenv
 
@@ -31,12 +47,56 @@ except ImportError:
     pass
 
 PROMPT_FILE = Path("SCRIPT_GENERATOR_PROMPT.md")
-HISTORY_FILE = Path("content_history.json")
 PENDING_SCRIPT_FILE = Path("pending_script.json")
+# Written by generate_video.py while a Veo job for pending_script.json is in
+# flight; a new script would orphan that (already paid for) job
+PENDING_OPERATION_FILE = Path("pending_operation.json")
 
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
-# How many past concepts to include in the prompt for the novelty check
-HISTORY_WINDOW = 120
+# How many recent concepts to show Gemini. Older ones are still enforced by the
+# local novelty index (novelty.py), which scores against the whole history
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "30"))
+# Regenerations allowed when every candidate is rejected (near-repeat, broken
+# rule...)
+NOVELTY_MAX_ATTEMPTS = int(os.getenv("NOVELTY_MAX_ATTEMPTS", "3"))
+# Candidate scripts requested concurrently per attempt; the best one is kept
+SCRIPT_CANDIDATES = max(1, int(os.getenv("SCRIPT_CANDIDATES", "1")))
+# Batch mode (--batch / SCRIPT_BATCH=1): write this many dated scripts to
+# script_queue.json in one request, whenever fewer than SCRIPT_QUEUE_LOW remain
+SCRIPT_BATCH_SIZE = int(os.getenv("SCRIPT_BATCH_SIZE", "7"))
+SCRIPT_QUEUE_LOW = int(os.getenv("SCRIPT_QUEUE_LOW", "2"))
+# Search-grounding citation markers, e.g. "[1, 2]"
+CITATION_MARKER = re.compile(r"\s*\[\d+(?:,\s*\d+)*\]")
+
+REQUIRED_FIELDS = ["concept_summary", "title", "caption", "video_prompt"]
+# Limits from the prompt's output format (soft) and the platforms' (hard)
+TITLE_MAX_CHARS = 70
+TITLE_HARD_MAX_CHARS = 100  # YouTube rejects longer titles
+CAPTION_MAX_CHARS = 500
+CAPTION_HASHTAGS = (5, 8)
+VIDEO_PROMPT_WORDS = (80, 160)
+# Quoted text in the video prompt gets spoken aloud by Veo; only these may be
+QUOTES_ALLOWED = {"pip!", "pip-pip!"}
+QUOTED_TEXT = re.compile(r"[\"“]([^\"”]{1,40})[\"”]")
+# Things the prompt's hard rules forbid outright, checked on the video prompt
+# (mentions that are negated — "no humans", "never a wand" — are fine)
+NEGATION = re.compile(r"\b(?:no|not|never|without|nor)\b[\w\s,-]{0,20}$", re.I)
+FORBIDDEN_VIDEO_PATTERNS = [
+    (re.compile(r"\bwands?\b", re.I), "Pip holds a wand"),
+    (re.compile(r"\b(?:humans?|people|person|crowds?)\b", re.I), "another character"),
+    (re.compile(r"\bsection \d\b|\bthe references\b", re.I), "meta reference"),
+    (re.compile(r"\bon-screen text\b|\bcaptions? on screen\b", re.I), "on-screen text"),
+]
+
+# Hedged generation: the ungrounded request is sent this many seconds after the
+# grounded one (0 = race both from the start, "off" = only as a fallback after
+# the grounded call fails)
+HEDGE_DELAY = os.getenv("SCRIPT_HEDGE_DELAY_SECONDS", "30")
+# A grounded result is preferred until this many seconds in; after that the
+# first successful result wins
+GROUNDED_DEADLINE_SECONDS = float(os.getenv("SCRIPT_GROUNDED_DEADLINE_SECONDS", "90"))
+# Hard cap on the whole script stage; whichever call is still out is abandoned
+SCRIPT_TIMEOUT_SECONDS = float(os.getenv("SCRIPT_TIMEOUT_SECONDS", "300"))
 
 
 def get_project_id():
@@ -51,34 +111,70 @@ def get_project_id():
     return None
 
 
-def load_history():
-    if HISTORY_FILE.exists():
-        try:
-            return json.loads(HISTORY_FILE.read_text())
-        except json.JSONDecodeError:
-            print("⚠️  content_history.json is corrupt, starting fresh.")
-    return []
-
-
-def save_history(history):
-    HISTORY_FILE.write_text(json.dumps(history, indent=2) + "\n")
+def static_prompt():
+    """
+    The prompt template with its per-day placeholders pointed at the "Today"
+    section that build_prompt appends. This part is byte-identical on every
+    call, which is what lets it be served from the Gemini context cache.
+    """
+    prompt = PROMPT_FILE.read_text().rstrip()
+    prompt = prompt.replace("{{TODAY}}", "see the Today section at the end")
+    prompt = prompt.replace(
+        "{{RECENT_CONCEPTS}}", "(listed in the Today section at the end)"
+    )
+    return prompt
 
 
-def build_prompt(history):
-    prompt = PROMPT_FILE.read_text()
+def build_prompt(too_similar=(), upcoming=()):
+    """
+    The static prompt followed by today's date and recent concepts.
+    `too_similar` lists past concepts an earlier attempt came too close to;
+    they're called out so the retry steers away. `upcoming` are scripts
+    already planned (the queue), listed after the history.
+    """
     today = date.today().isoformat()
 
-    recent = history[-HISTORY_WINDOW:]
+    # Leave out an earlier run's entry for today, so a same-day rerun builds
+    # the same prompt (and hits the response cache) instead of avoiding it.
+    # Only the newest history segments are read.
+    recent = history_store.tail(HISTORY_WINDOW, exclude_dates={today})
+    recent = (recent + list(upcoming))[-HISTORY_WINDOW:]
     if recent:
         lines = "\n".join(
             f"- [{item['date']}] {item['concept_summary']}" for item in recent
         )
     else:
         lines = "(No previous videos yet — this is the first one!)"
+    if too_similar:
+        lines += (
+            "\n\nA previous attempt today was rejected as too close to these "
+            "past videos — pick a clearly different object AND outcome:\n"
+        )
+        lines += "\n".join(
+            f"- [{item['date']}] {item['concept_summary']}" for item in too_similar
+        )
 
-    prompt = prompt.replace("{{TODAY}}", today)
-    prompt = prompt.replace("{{RECENT_CONCEPTS}}", lines)
-    return prompt
+    return (
+        f"{static_prompt()}\n\n## Today\n\n"
+        f"Today's date: **{today}**\n\n"
+        f"Concepts already used (do NOT repeat):\n\n{lines}\n"
+    )
+
+
+def build_batch_prompt(upcoming, dates, too_similar=()):
+    """The daily prompt, rewritten to ask for one script per date in one reply."""
+    prompt = build_prompt(too_similar, upcoming)
+    return prompt + (
+        "\n\n## Batch Mode\n\n"
+        f"Instead of one script, write {len(dates)} scripts — one for each of "
+        f"these upcoming dates: {', '.join(dates)}. Choose each concept for its "
+        "own date (holidays, seasons and trends around that day). Every concept "
+        "must be clearly different in object and outcome from every other one "
+        "in this batch as well as from the log above. Respond with only a single "
+        'JSON object of the form {"scripts": [...]}, where each element has a '
+        '"date" field (one of the dates above) plus exactly the fields of the '
+        "output format above.\n"
+    )
 
 
 def parse_json_response(text):
@@ -97,32 +193,388 @@ def parse_json_response(text):
     return json.loads(text)
 
 
-def generate_script(client, prompt):
-    """Call Gemini, preferring Google Search grounding for trend/holiday awareness."""
-    configs = [
+def script_configs():
+    """The grounded (preferred) and plain (fallback) generation configs."""
+    return {
         # Preferred: with search grounding (trends, holidays)
-        types.GenerateContentConfig(
+        "grounded": types.GenerateContentConfig(
             temperature=1.0,
             tools=[types.Tool(google_search=types.GoogleSearch())],
         ),
         # Fallback: no tools (prompt still has evergreen guidance)
-        types.GenerateContentConfig(temperature=1.0),
-    ]
-
-    last_error = None
-    for config in configs:
+        "plain": types.GenerateContentConfig(temperature=1.0),
+    }
+
+
+def request_script(client, prompt, configs, variant):
+    """
+    One Gemini call with the `variant` config. The static prompt prefix is
+    served from the context cache when possible, so only the dynamic suffix
+    is sent.
+    """
+    config = configs[variant]
+    static = static_prompt()
+    cache_name = None
+    if prompt.startswith(static):
+        cache_name = context_cache.cached_content_name(
+            client, GEMINI_MODEL, static, variant, config.tools
+        )
+    if cache_name:
         try:
             response = client.models.generate_content(
-                model=GEMINI_MODEL, contents=prompt, config=config
+                model=GEMINI_MODEL,
+                contents=prompt[len(static) :].lstrip(),
+                config=types.GenerateContentConfig(
+                    temperature=config.temperature, cached_content=cache_name
+                ),
             )
+        except Exception as e:
+            print(f"⚠️  Cached-context call failed ({e}), retrying uncached...")
+            context_cache.forget(cache_name)
+        else:
             return parse_json_response(response.text)
+
+    response = client.models.generate_content(
+        model=GEMINI_MODEL, contents=prompt, config=config
+    )
+    return parse_json_response(response.text)
+
+
+def generate_script_sequential(client, prompt, configs):
+    """Try the grounded config, then the plain one once it has failed."""
+    last_error = None
+    for variant in configs:
+        try:
+            return request_script(client, prompt, configs, variant)
         except Exception as e:
             last_error = e
             print(f"⚠️  Generation attempt failed ({e}), trying fallback...")
     raise last_error
 
 
+def generate_script_hedged(client, prompt, configs, hedge_delay):
+    """
+    Race the grounded and plain configs so a slow grounded call can't stall
+    the stage.
+
+    The plain request is launched `hedge_delay` seconds after the grounded one
+    (or as soon as the grounded one fails). A grounded result is returned
+    whenever it arrives before GROUNDED_DEADLINE_SECONDS; past that, the first
+    successful result wins. Calls run on daemon threads, so the loser is
+    simply abandoned rather than holding up the process.
+    """
+    results = queue.Queue()
+
+    def launch(name):
+        def run():
+            try:
+                script = request_script(client, prompt, configs, name)
+                results.put((name, script, None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        threading.Thread(target=run, name=f"gemini-{name}", daemon=True).start()
+
+    start = time.monotonic()
+    launch("grounded")
+    in_flight = {"grounded"}
+    plain_launched = False
+    plain_result = None
+    last_error = None
+
+    while True:
+        elapsed = time.monotonic() - start
+        if not plain_launched:
+            wake_at = hedge_delay
+        elif plain_result is not None:
+            wake_at = GROUNDED_DEADLINE_SECONDS
+        else:
+            wake_at = SCRIPT_TIMEOUT_SECONDS
+        try:
+            name, result, error = results.get(timeout=max(0.0, wake_at - elapsed))
+        except queue.Empty:
+            if not plain_launched:
+                print(
+                    f"ℹ️  Grounded call still running after {hedge_delay:.0f}s, "
+                    "hedging with an ungrounded request..."
+                )
+                launch("plain")
+                in_flight.add("plain")
+                plain_launched = True
+                continue
+            if plain_result is not None:
+                print("ℹ️  Grounded call missed its deadline, using ungrounded script.")
+                return plain_result
+            raise TimeoutError(
+                f"Script generation still running after {SCRIPT_TIMEOUT_SECONDS:.0f}s"
+            )
+
+        in_flight.discard(name)
+        if error is not None:
+            last_error = error
+            print(f"⚠️  {name.capitalize()} generation attempt failed ({error})")
+            if plain_result is not None:
+                return plain_result
+            if not plain_launched:
+                launch("plain")
+                in_flight.add("plain")
+                plain_launched = True
+            elif not in_flight:
+                raise last_error
+            continue
+
+        if name == "grounded":
+            print(f"✓ Grounded script ready after {time.monotonic() - start:.0f}s")
+            return result
+        # Plain result: hold it until the grounded call lands or its deadline
+        elapsed = time.monotonic() - start
+        if "grounded" not in in_flight or elapsed >= GROUNDED_DEADLINE_SECONDS:
+            return result
+        plain_result = result
+
+
+def generate_script(client, prompt, variant=0):
+    """
+    Call Gemini, preferring Google Search grounding for trend/holiday awareness.
+
+    Identical requests are served from the response cache; `variant` keeps
+    the concurrent candidates of a multi-candidate run from sharing an entry.
+    """
+    configs = script_configs()
+    cache = response_cache.get_cache()
+    key = response_cache.make_key(
+        "script", model=GEMINI_MODEL, prompt=prompt, configs=configs, variant=variant
+    )
+    cached = cache.get_json(key, "script")
+    if cached is not None:
+        return cached
+
+    if HEDGE_DELAY.strip().lower() == "off":
+        script = generate_script_sequential(client, prompt, configs)
+    else:
+        script = generate_script_hedged(client, prompt, configs, float(HEDGE_DELAY))
+    cache.put_json(key, script)
+    return script
+
+
+def clean_script(script):
+    """Strip citation markers that must never reach a public caption."""
+    for key in REQUIRED_FIELDS:
+        if isinstance(script.get(key), str):
+            script[key] = CITATION_MARKER.sub("", script[key]).strip()
+    return script
+
+
+def check_script(script):
+    """
+    Check a candidate against the prompt's rules.
+
+    Returns:
+        tuple: (problems, penalty) — any problem disqualifies the script;
+               the penalty counts soft-limit misses (lengths, hashtag count)
+    """
+    missing = [k for k in REQUIRED_FIELDS if not script.get(k)]
+    if missing:
+        return [f"missing fields {missing}"], 0
+
+    problems = []
+    title, caption = script["title"], script["caption"]
+    video_prompt = script["video_prompt"]
+    if len(title) > TITLE_HARD_MAX_CHARS:
+        problems.append(f"title is {len(title)} chars")
+    if "#PipsProjects" not in caption:
+        problems.append("caption lacks #PipsProjects")
+    for quoted in QUOTED_TEXT.findall(video_prompt):
+        if quoted.strip().lower() not in QUOTES_ALLOWED:
+            problems.append(f'quoted vocalization "{quoted}"')
+    for pattern, rule in FORBIDDEN_VIDEO_PATTERNS:
+        for match in pattern.finditer(video_prompt):
+            if not NEGATION.search(video_prompt[: match.start()]):
+                problems.append(rule)
+                break
+
+    penalty = 0
+    if len(title) > TITLE_MAX_CHARS or "#" in title:
+        penalty += 1
+    if len(caption) > CAPTION_MAX_CHARS:
+        penalty += 1
+    hashtags = len(re.findall(r"#\w+", caption))
+    if not CAPTION_HASHTAGS[0] <= hashtags <= CAPTION_HASHTAGS[1]:
+        penalty += 1
+    words = len(video_prompt.split())
+    if not VIDEO_PROMPT_WORDS[0] <= words <= VIDEO_PROMPT_WORDS[1]:
+        penalty += 1
+    return problems, penalty
+
+
+def generate_candidates(client, prompt, count):
+    """Request `count` scripts concurrently; failed requests are dropped."""
+    if count == 1:
+        return [generate_script(client, prompt)]
+    candidates = []
+    last_error = None
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [
+            pool.submit(generate_script, client, prompt, variant)
+            for variant in range(count)
+        ]
+        for future in futures:
+            try:
+                candidates.append(future.result())
+            except Exception as e:
+                last_error = e
+                print(f"⚠️  Candidate generation failed ({e})")
+    if not candidates:
+        raise last_error
+    return candidates
+
+
+def select_script(candidates, index, today):
+    """
+    Pick the best candidate: rule-abiding, novel, fewest soft-limit misses,
+    then least similar to anything in the history.
+
+    Returns:
+        tuple: (script or None, past concepts the rejected repeats were near)
+    """
+    ranked = []
+    too_similar = []
+    for number, script in enumerate(candidates, 1):
+        clean_script(script)
+        problems, penalty = check_script(script)
+        if problems:
+            print(f"⚠️  Candidate {number} rejected: {'; '.join(problems)}")
+            continue
+        # Today's own entry is excluded so a same-day rerun isn't self-rejected
+        novel, neighbours = index.check(
+            script["concept_summary"], exclude_dates={today}
+        )
+        if not novel:
+            print(
+                f"⚠️  Candidate {number} is a near-repeat: "
+                f"{script['concept_summary']}"
+            )
+            for score, entry in neighbours[:3]:
+                print(
+                    f"     {score:.2f} ~ [{entry['date']}] {entry['concept_summary']}"
+                )
+            too_similar.extend(entry for _, entry in neighbours[:3])
+            continue
+        similarity = neighbours[0][0] if neighbours else 0.0
+        ranked.append((penalty, similarity, number, script))
+
+    if not ranked:
+        return None, too_similar
+    penalty, similarity, number, script = min(ranked, key=lambda r: r[:3])
+    if len(candidates) > 1:
+        print(
+            f"✓ Picked candidate {number} of {len(candidates)} "
+            f"(soft-limit misses {penalty}, closest past concept {similarity:.2f})"
+        )
+    return script, too_similar
+
+
+def select_batch(scripts, index, context, dates):
+    """
+    Keep the batch scripts that pass check_script and are novel against the
+    history, the `context` scripts (the existing queue) and the batch
+    scripts accepted before them.
+
+    Returns:
+        tuple: (accepted scripts with their dates, past concepts the rejected
+               repeats were near)
+    """
+    accepted = []
+    too_similar = []
+    free_dates = list(dates)
+    for number, script in enumerate(scripts, 1):
+        if not free_dates:
+            # The model can return a full batch on a retry for fewer dates
+            print("ℹ️  Every queue date is filled; ignoring the other scripts.")
+            break
+        if not isinstance(script, dict):
+            continue
+        clean_script(script)
+        problems, _ = check_script(script)
+        if problems:
+            print(f"⚠️  Batch script {number} rejected: {'; '.join(problems)}")
+            continue
+        index.set_extra(context + accepted)
+        novel, neighbours = index.check(script["concept_summary"])
+        if not novel:
+            print(
+                f"⚠️  Batch script {number} is a near-repeat: "
+                f"{script['concept_summary']}"
+            )
+            too_similar.extend(entry for _, entry in neighbours[:3])
+            continue
+        # Keep the date the concept was written for, if it's still free
+        day = script.get("date")
+        if day not in free_dates:
+            day = free_dates[0]
+        free_dates.remove(day)
+        script["date"] = day
+        accepted.append(script)
+    return accepted, too_similar
+
+
+def run_batch(client, index):
+    """Top the script queue up with a week of scripts from a single request."""
+    queue = script_queue.load_queue()
+    if len(queue) >= SCRIPT_QUEUE_LOW:
+        print(
+            f"ℹ️  {len(queue)} script(s) already queued in "
+            f"{script_queue.QUEUE_FILE}; nothing to generate."
+        )
+        return
+
+    dates = script_queue.next_dates(queue, SCRIPT_BATCH_SIZE)
+    too_similar = []
+    accepted = []
+    for _ in range(NOVELTY_MAX_ATTEMPTS):
+        print(
+            f"Generating {len(dates)} scripts ({dates[0]} → {dates[-1]}) "
+            f"with {GEMINI_MODEL} in one request..."
+        )
+        prompt = build_batch_prompt(queue + accepted, dates, too_similar)
+        reply = generate_script(client, prompt)
+        scripts = reply.get("scripts", []) if isinstance(reply, dict) else reply
+        batch, near = select_batch(scripts, index, queue + accepted, dates)
+        accepted += batch
+        dates = [d for d in dates if d not in {s["date"] for s in batch}]
+        if not dates:
+            break
+        too_similar.extend(entry for entry in near if entry not in too_similar)
+    if not accepted:
+        print(f"❌ No usable script in {NOVELTY_MAX_ATTEMPTS} batch attempts.")
+        sys.exit(1)
+
+    script_queue.save_queue(queue + accepted)
+    print(
+        f"✓ Queued {len(accepted)} script(s) in {script_queue.QUEUE_FILE} "
+        f"({len(queue) + len(accepted)} total)"
+    )
+    for script in sorted(accepted, key=lambda s: s["date"]):
+        print(f"  {script['date']}: {script['title']}")
+
+
 def main():
+    if PENDING_SCRIPT_FILE.exists() and PENDING_OPERATION_FILE.exists():
+        print(
+            f"ℹ️  {PENDING_SCRIPT_FILE} has a Veo job in flight "
+            f"({PENDING_OPERATION_FILE}); keeping it so the video step can "
+            "resume that job. Skipping script generation."
+        )
+        return
+
+    batch = "--batch" in sys.argv[1:] or os.getenv("SCRIPT_BATCH") == "1"
+    if not batch and script_queue.load_queue():
+        print(
+            f"ℹ️  {script_queue.QUEUE_FILE} has scripts waiting; "
+            "generate_video.py will take the next one. Skipping script generation."
+        )
+        return
+
     project = get_project_id()
     if not project:
         print(
@@ -137,25 +589,34 @@ def main():
         location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
     )
 
-    history = load_history()
-    prompt = build_prompt(history)
-    today = date.today().isoformat()
+    # The novelty index scores against every past concept; only history
+    # segments changed since its last run are read
+    index = novelty.load_index()
+    if batch:
+        run_batch(client, index)
+        return
 
-    print(f"Generating today's script ({today}) with {GEMINI_MODEL}...")
-    script = generate_script(client, prompt)
+    today = date.today().isoformat()
+    too_similar = []
 
-    # Validate required fields
-    required = ["concept_summary", "title", "caption", "video_prompt"]
-    missing = [k for k in required if not script.get(k)]
-    if missing:
-        print(f"❌ Model response missing fields: {missing}\n{script}")
+    for _ in range(NOVELTY_MAX_ATTEMPTS):
+        count = f", {SCRIPT_CANDIDATES} candidates" if SCRIPT_CANDIDATES > 1 else ""
+        print(f"Generating today's script ({today}) with {GEMINI_MODEL}{count}...")
+        candidates = generate_candidates(
+            client, build_prompt(too_similar), SCRIPT_CANDIDATES
+        )
+        script, near = select_script(candidates, index, today)
+        if script:
+            break
+        too_similar.extend(entry for entry in near if entry not in too_similar)
+    else:
+        print(
+            f"❌ No usable script in {NOVELTY_MAX_ATTEMPTS} attempts (every "
+            "candidate broke a rule or repeated a past concept); not generating "
+            "a video."
+        )
         sys.exit(1)
 
-    # Strip search-grounding citation markers (e.g. "[1, 2]") that Gemini
-    # sometimes leaves in the text — they must never reach a public caption
-    for key in required:
-        script[key] = re.sub(r"\s*\[\d+(?:,\s*\d+)*\]", "", script[key]).strip()
-
     script["date"] = today
 
     PENDING_SCRIPT_FILE.write_text(json.dumps(script, indent=2) + "\n")
@@ -163,18 +624,9 @@ def main():
     print(f"  Concept: {script['concept_summary']}")
     print(f"  Title:   {script['title']}")
 
-    # Log the concept so future runs never repeat it. Replace any existing
-    # entry for today so a same-day rerun doesn't create duplicates.
-    history = [h for h in history if h.get("date") != today]
-    history.append(
-        {
-            "date": today,
-            "concept_summary": script["concept_summary"],
-            "title": script["title"],
-        }
-    )
-    save_history(history)
-    print(f"✓ Appended concept to {HISTORY_FILE} ({len(history)} total)")
+    # Log the concept so future runs never repeat it
+    total = script_queue.record_in_history(script)
+    print(f"✓ Appended concept to {history_store.history_dir()}/ ({total} total)")
 
 
 if __name__ == "__main__":
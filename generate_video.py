@@ -2,28 +2,48 @@
 """
 Daily video generation for Pip's Projects.
 
-Takes the script produced by generate_script.py (pending_script.json) and
-generates an 8-second vertical video with Veo on Vertex AI, using the
-character/workshop/machine reference images in resources/ to keep Pip visually
-consistent across every video.
+Takes the script produced by generate_script.py (pending_script.json, or the
+next entry of script_queue.json when there is none) and generates an 8-second
+vertical video with Veo on Vertex AI, using the character/workshop/machine
+reference images in resources/ to keep Pip visually consistent across every
+video.
 
 Outputs:
-  - videos/pip_<date>.mp4      (picked up by post_script.py)
-  - video_info.json            (title + caption entry for the new video)
+  - videos/pip_<date>.mp4.ptr  (pointer to the video in the object store,
+                                picked up by post_script.py; the .mp4 beside
+                                it is a local, uncommitted copy)
+  - video_info.json            (title + caption entry for the new video, plus
+                                the pre-staged Instagram hosting URL, via the
+                                state store in state_store.py)
+  - pending_operation.json     (checkpoint of the in-flight Veo job(s) and
+                                their regions, so an interrupted run is
+                                resumed, not resubmitted)
   - deletes pending_script.json on success
 """
 
+import hashlib
 import json
 import mimetypes
 import os
 import sys
-import time
-from datetime import date
+import tempfile
+import threading
+from datetime import date, datetime, timezone
 from pathlib import Path
+from urllib.parse import quote
 
 from google import genai
 from google.genai import types
 
+import media_hosts
+import object_store
+import polling
+import response_cache
+import script_queue
+import state_store
+import transport
+import veo_regions
+
 try:
     from dotenv import load_dotenv
 
@@ -32,7 +52,10 @@ except ImportError:
     pass
 
 PENDING_SCRIPT_FILE = Path("pending_script.json")
-VIDEO_INFO_FILE = Path("video_info.json")
+# Checkpoint of the in-flight Veo job for pending_script.json, written as soon
+# as it's submitted so a timed-out/cancelled/crashed run can be resumed by the
+# next one instead of paying for a second generation
+PENDING_OPERATION_FILE = Path("pending_operation.json")
 RESOURCES_DIR = Path("resources")
 VIDEOS_DIR = Path("videos")
 # Fixed character/setting/style preamble prepended to every Veo prompt so the
@@ -64,8 +87,31 @@ NEGATIVE_PROMPT = os.getenv(
 # small creatures into the scene. Only clean single-subject images go in.
 PREFERRED_REFERENCES = ["1.png", "3.png"]
 MAX_REFERENCES = 3
-POLL_INTERVAL_SECONDS = 20
 TIMEOUT_SECONDS = 20 * 60
+# Results are written to disk in pieces of this size, so memory use doesn't
+# grow with clip length or resolution
+VIDEO_CHUNK_SIZE = 1024 * 1024
+# Optional gs:// prefix for Veo to write results to; they are then streamed
+# down instead of arriving inline in the operation response
+VEO_OUTPUT_GCS_URI = os.getenv("VEO_OUTPUT_GCS_URI")
+# Buffer mode (--buffer / VIDEO_BUFFER=1): when fewer than BUFFER_LOW videos
+# are ready or in flight, render enough queued scripts to reach BUFFER_HIGH,
+# at most BUFFER_MAX_JOBS Veo jobs at a time
+BUFFER_LOW = int(os.getenv("BUFFER_LOW", "2"))
+BUFFER_HIGH = int(os.getenv("BUFFER_HIGH", "4"))
+BUFFER_MAX_JOBS = int(os.getenv("BUFFER_MAX_JOBS", "3"))
+# Several buffer videos can be rendered on one day, so their history entries
+# are told apart by title as well as date
+HISTORY_KEY = ("date", "title")
+# Default region for checkpoints written before jobs recorded their location
+LEGACY_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+# Older checkpoints are abandoned (Veo results don't stay retrievable forever)
+OPERATION_MAX_AGE_HOURS = 24
+# An 8-second Veo clip typically takes 1-3 minutes: first check after a
+# minute, then back off from 10s up to 30s between checks
+VEO_POLL = polling.PollPolicy(
+    first_delay=60, interval=10, max_interval=30, timeout=TIMEOUT_SECONDS
+)
 
 
 def get_project_id():
@@ -108,63 +154,267 @@ def load_reference(path):
     return types.VideoGenerationReferenceImage(image=image, reference_type="asset")
 
 
-def extract_video_bytes(client, generated_video):
-    """Get raw video bytes from the operation result, wherever the SDK put them."""
-    video = generated_video.video
-    if getattr(video, "video_bytes", None):
-        return video.video_bytes
-    # Fallback: ask the SDK to download it (handles URI-based results)
-    client.files.download(file=video)
-    if getattr(video, "video_bytes", None):
-        return video.video_bytes
-    raise RuntimeError(
-        f"Could not extract video bytes from result (uri={getattr(video, 'uri', None)})"
+def stream_gcs_object(uri):
+    """Stream a gs:// object through the Cloud Storage JSON API."""
+    import google.auth
+    from google.auth.transport.requests import Request
+
+    bucket, _, name = uri[len("gs://") :].partition("/")
+    credentials, _ = google.auth.default(
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+    credentials.refresh(Request())
+    response = transport.get(
+        f"https://storage.googleapis.com/storage/v1/b/{bucket}/o/"
+        f"{quote(name, safe='')}",
+        params={"alt": "media"},
+        headers={"Authorization": f"Bearer {credentials.token}"},
+        stream=True,
+        timeout=transport.UPLOAD_TIMEOUT,
     )
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Downloading {uri} failed: {response.status_code}")
+        yield from response.iter_content(VIDEO_CHUNK_SIZE)
 
 
-def main():
-    if not PENDING_SCRIPT_FILE.exists():
-        print(
-            "❌ No pending_script.json found. Run generate_script.py first "
-            "(nothing to generate)."
+def iter_video_chunks(client, generated_video):
+    """
+    Yield the generated video's bytes in chunks, wherever the SDK put them:
+    inline in the response, at a gs:// URI (streamed), or — as a last resort
+    — via the SDK's own download.
+    """
+    video = generated_video.video
+    data = getattr(video, "video_bytes", None)
+    uri = getattr(video, "uri", None)
+    if not data and uri and uri.startswith("gs://"):
+        yield from stream_gcs_object(uri)
+        return
+    if not data:
+        client.files.download(file=video)
+        data = getattr(video, "video_bytes", None)
+    if not data:
+        raise RuntimeError(
+            f"Could not extract video bytes from result (uri={uri})"
         )
-        sys.exit(1)
+    view = memoryview(data)
+    for start in range(0, len(view), VIDEO_CHUNK_SIZE):
+        yield view[start : start + VIDEO_CHUNK_SIZE]
 
-    script = json.loads(PENDING_SCRIPT_FILE.read_text())
-    for key in ("title", "caption", "video_prompt"):
-        if not script.get(key):
-            print(f"❌ pending_script.json is missing '{key}'.")
-            sys.exit(1)
 
-    project = get_project_id()
-    if not project:
+def iter_file_chunks(path):
+    with open(path, "rb") as f:
+        yield from iter(lambda: f.read(VIDEO_CHUNK_SIZE), b"")
+
+
+def write_video_atomic(path, chunks):
+    """
+    Write chunks to a temp file beside `path`, hashing as they go, then
+    rename it into place — a crash never leaves a truncated video behind.
+
+    Returns:
+        tuple: (size in bytes, sha256 hex digest)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+def prestage_hosting_copy(video_path, size, sha256):
+    """
+    Publish the public hosting copy Instagram ingests from right away, so the
+    posting run doesn't pay for the upload (and CDN propagation) later.
+
+    Returns:
+        dict: hosted_url/hosted_size/hosted_sha256 to record under the video's
+              "uploads" -> "instagram" state, or None if nothing was staged
+    """
+    if os.getenv("PRESTAGE_INSTAGRAM_COPY", "1") != "1":
+        return None
+    host = media_hosts.get_media_host()
+    if not host.persistent or not host.is_configured():
         print(
-            "❌ No GCP project found. Set GOOGLE_APPLICATION_CREDENTIALS to your "
-            "service account key file (or set GOOGLE_CLOUD_PROJECT)."
+            f"ℹ️  Media host '{host.name}' can't pre-stage here; "
+            "post_script.py will host the video at posting time."
         )
-        sys.exit(1)
-
-    client = genai.Client(
-        vertexai=True,
-        project=project,
-        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+        return None
+    try:
+        url = host.publish(video_path)
+    except Exception as e:
+        # Not fatal: posting falls back to publishing the copy itself
+        print(f"⚠️  Could not pre-stage the Instagram hosting copy: {e}")
+        return None
+    print(f"✓ Pre-staged Instagram hosting copy: {url}")
+    return {"hosted_url": url, "hosted_size": size, "hosted_sha256": sha256}
+
+
+def request_hash(prompt, config_kwargs, reference_paths):
+    """Hash everything that determines the Veo output, to match checkpoints."""
+    settings = {k: v for k, v in config_kwargs.items() if k != "reference_images"}
+    payload = json.dumps(
+        {
+            "model": VEO_MODEL,
+            "prompt": prompt,
+            "config": settings,
+            "references": [
+                hashlib.sha256(p.read_bytes()).hexdigest() for p in reference_paths
+            ],
+        },
+        sort_keys=True,
     )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_operation_records():
+    """Every checkpointed in-flight Veo job (buffer mode can have several)."""
+    if not PENDING_OPERATION_FILE.exists():
+        return []
+    try:
+        data = json.loads(PENDING_OPERATION_FILE.read_text())
+    except json.JSONDecodeError:
+        print("⚠️  pending_operation.json is corrupt, ignoring it.")
+        return []
+    # A single record is what a run without buffer mode writes
+    return data if isinstance(data, list) else [data]
+
+
+def save_operation_records(records):
+    if not records:
+        PENDING_OPERATION_FILE.unlink(missing_ok=True)
+        return
+    payload = records[0] if len(records) == 1 else records
+    PENDING_OPERATION_FILE.write_text(json.dumps(payload, indent=2) + "\n")
 
-    references = [load_reference(p) for p in pick_reference_images()]
-    if references:
-        print(f"Using {len(references)} reference image(s) from {RESOURCES_DIR}/")
-    else:
-        print("⚠️  No reference images found in resources/ — generating without them.")
 
+def record_operations(record):
+    """A checkpoint's jobs as [{"name", "location"}], whatever its vintage."""
+    if "operations" in record:
+        return record["operations"]
+    return [{"name": record["operation"], "location": LEGACY_LOCATION}]
+
+
+def record_age_hours(record):
+    """Hours since the job was submitted, or None if the record is unreadable."""
+    try:
+        submitted_at = datetime.fromisoformat(record["submitted_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (datetime.now(timezone.utc) - submitted_at).total_seconds() / 3600
+
+
+def load_operation_checkpoint(prompt_hash):
+    """
+    Return the saved in-flight jobs ([{"name", "location"}]) for this exact
+    request, or an empty list. Checkpoints for a different prompt, or too old
+    to still be retrievable, are discarded.
+    """
+    records = [r for r in load_operation_records() if "script" not in r]
+    if not records:
+        return []
+    record = records[-1]
+    age_hours = record_age_hours(record)
+    if age_hours is None or not ("operations" in record or "operation" in record):
+        print("⚠️  pending_operation.json is corrupt, ignoring it.")
+        return []
+    if record.get("prompt_hash") != prompt_hash:
+        print("ℹ️  Saved Veo operation was for a different prompt, ignoring it.")
+        return []
+    if age_hours > OPERATION_MAX_AGE_HOURS:
+        print(f"ℹ️  Saved Veo operation is {age_hours:.0f}h old, ignoring it.")
+        return []
+    return record_operations(record)
+
+
+# Buffer-mode jobs checkpoint from their own threads
+_checkpoint_lock = threading.Lock()
+
+
+def save_operation_checkpoint(operations, prompt_hash, script=None):
+    """
+    Checkpoint a request's live jobs (one per region it's running in).
+    Buffer-mode jobs carry their whole script, since there's no
+    pending_script.json for them; the single job for pending_script.json
+    replaces any earlier one.
+    """
+    with _checkpoint_lock:
+        records = load_operation_records()
+        submitted_at = next(
+            (r["submitted_at"] for r in records if r.get("prompt_hash") == prompt_hash),
+            datetime.now(timezone.utc).isoformat(),
+        )
+        records = [
+            r
+            for r in records
+            if r.get("prompt_hash") != prompt_hash
+            and ("script" in r or script is not None)
+        ]
+        record = {
+            "operations": operations,
+            "submitted_at": submitted_at,
+            "prompt_hash": prompt_hash,
+            "model": VEO_MODEL,
+        }
+        if script is not None:
+            record["script"] = script
+        save_operation_records(records + [record])
+    print(f"✓ Checkpointed Veo operation(s) in {PENDING_OPERATION_FILE}")
+
+
+def clear_operation_checkpoint(prompt_hash):
+    with _checkpoint_lock:
+        save_operation_records(
+            [
+                r
+                for r in load_operation_records()
+                if r.get("prompt_hash") != prompt_hash
+            ]
+        )
+
+
+def promote_queued_script():
+    """
+    Move the next script from script_queue.json into pending_script.json and
+    log its concept, dated today.
+
+    Returns:
+        bool: whether a queued script was available
+    """
+    script = script_queue.take_next()
+    if not script:
+        return False
+    planned = script["date"]
+    script["date"] = date.today().isoformat()
+    PENDING_SCRIPT_FILE.write_text(json.dumps(script, indent=2) + "\n")
+    script_queue.record_in_history(script)
+    print(f"✓ Took queued script (planned for {planned}): {script['title']}")
+    return True
+
+
+def build_request(script, reference_paths, references):
+    """
+    Assemble the Veo prompt and config for a script.
+
+    Returns:
+        tuple: (full prompt, config kwargs, request hash for checkpoints)
+    """
     video_prompt = script["video_prompt"]
     if STYLE_PREFIX_FILE.exists():
         video_prompt = f"{STYLE_PREFIX_FILE.read_text().strip()} {video_prompt}"
 
-    print(f"Generating video with {VEO_MODEL}...")
-    # Log the full scene prompt — essential evidence when investigating why
-    # a generated video misbehaved (was it the script's text or the model?)
-    print(f"--- Scene prompt ---\n{script['video_prompt']}\n--------------------")
-
     config_kwargs = {
         "aspect_ratio": "9:16",
         "duration_seconds": 8,
@@ -173,57 +423,349 @@ def main():
     }
     if references:
         config_kwargs["reference_images"] = references
+    if VEO_OUTPUT_GCS_URI:
+        config_kwargs["output_gcs_uri"] = VEO_OUTPUT_GCS_URI
+    prompt_hash = request_hash(video_prompt, config_kwargs, reference_paths)
+    return video_prompt, config_kwargs, prompt_hash
 
-    operation = client.models.generate_videos(
+
+def log_request(script):
+    print(f"Generating video with {VEO_MODEL}: {script['title']}")
+    # Log the full scene prompt — essential evidence when investigating why
+    # a generated video misbehaved (was it the script's text or the model?)
+    print(f"--- Scene prompt ---\n{script['video_prompt']}\n--------------------")
+
+
+def submit_generation(client, video_prompt, config_kwargs):
+    return client.models.generate_videos(
         model=VEO_MODEL,
         prompt=video_prompt,
         config=types.GenerateVideosConfig(**config_kwargs),
     )
 
-    # Poll until the long-running generation finishes
-    start = time.time()
-    while not operation.done:
-        if time.time() - start > TIMEOUT_SECONDS:
-            print("❌ Video generation timed out.")
-            sys.exit(1)
-        elapsed = int(time.time() - start)
-        print(f"  ...still generating ({elapsed}s elapsed)")
-        time.sleep(POLL_INTERVAL_SECONDS)
-        operation = client.operations.get(operation)
 
-    if operation.error:
-        print(f"❌ Video generation failed: {operation.error}")
-        sys.exit(1)
+def attach_operation(client, operation_name):
+    return client.operations.get(types.GenerateVideosOperation(name=operation_name))
+
+
+def regional_job(client_factory, video_prompt, config_kwargs, prompt_hash, script=None):
+    """
+    A Veo request that fails over and hedges across VEO_LOCATIONS, with its
+    live jobs checkpointed whenever they change. `script` is embedded in the
+    checkpoint for buffer-mode jobs.
+    """
+    return veo_regions.RegionalJob(
+        client_factory,
+        submit=lambda client: submit_generation(client, video_prompt, config_kwargs),
+        poll_policy=VEO_POLL,
+        on_change=lambda ops: save_operation_checkpoint(ops, prompt_hash, script),
+        attach=attach_operation,
+    )
+
 
+def generated_video(operation):
+    """The finished operation's video; RuntimeError if it produced none."""
+    if operation.error:
+        raise RuntimeError(f"Video generation failed: {operation.error}")
     generated = (operation.response and operation.response.generated_videos) or []
     if not generated:
-        print(f"❌ No video returned. Full response: {operation.response}")
-        sys.exit(1)
+        raise RuntimeError(f"No video returned. Full response: {operation.response}")
+    return generated[0]
 
-    video_bytes = extract_video_bytes(client, generated[0])
 
-    # Save the video where post_script.py expects it
-    VIDEOS_DIR.mkdir(exist_ok=True)
+def video_path_for(script):
+    """
+    videos/pip_<date>.mp4 for a script, or pip_<date>_2.mp4 and so on when
+    the buffer renders several scripts on one day. A rerun for the same
+    script gets the name it had before.
+    """
     video_date = script.get("date", date.today().isoformat())
-    video_path = VIDEOS_DIR / f"pip_{video_date}.mp4"
-    video_path.write_bytes(video_bytes)
-    print(f"✓ Saved video: {video_path} ({len(video_bytes) / 1e6:.1f} MB)")
+    store = state_store.get_store()
+    number = 1
+    while True:
+        suffix = f"_{number}" if number > 1 else ""
+        name = f"pip_{video_date}{suffix}.mp4"
+        entry = store.entry(name)
+        if entry is not None and entry.get("title") == script["title"]:
+            return VIDEOS_DIR / name
+        taken = entry is not None or any(
+            (folder / candidate).exists()
+            for folder in (VIDEOS_DIR, Path("posted_archive"))
+            for candidate in (name, name + object_store.POINTER_SUFFIX)
+        )
+        if not taken:
+            return VIDEOS_DIR / name
+        number += 1
+
+
+def store_video(script, chunks):
+    """
+    Stream the video to where post_script.py expects it and register it,
+    with the size and sha256 computed on the way in.
+    """
+    VIDEOS_DIR.mkdir(exist_ok=True)
+    video_path = video_path_for(script)
+    size, sha256 = write_video_atomic(video_path, chunks)
+    print(f"✓ Saved video: {video_path} ({size / 1e6:.1f} MB, sha256 {sha256[:12]})")
+    # Only the pointer is committed; the bytes live in the object store
+    object_store.upload(video_path, sha256, size)
 
     # Register title + caption for post_script.py
-    video_info = {}
-    if VIDEO_INFO_FILE.exists():
-        try:
-            video_info = json.loads(VIDEO_INFO_FILE.read_text())
-        except json.JSONDecodeError:
-            print("⚠️  video_info.json is corrupt, rebuilding it.")
-    video_info[video_path.name] = {
+    entry = {
         "title": script["title"],
         "description": script["caption"],
+        "size": size,
+        "sha256": sha256,
     }
-    VIDEO_INFO_FILE.write_text(json.dumps(video_info, indent=2) + "\n")
-    print(f"✓ Updated {VIDEO_INFO_FILE}")
+    staged = prestage_hosting_copy(video_path, size, sha256)
+    if staged:
+        entry["uploads"] = {"instagram": staged}
+    store = state_store.get_store()
+    store.put_entry(video_path.name, entry)
+    store.export_json()
+    return video_path
+
+
+def missing_script_fields(script):
+    return [key for key in ("title", "caption", "video_prompt") if not script.get(key)]
+
+
+def count_ready_videos():
+    return len(object_store.list_videos(VIDEOS_DIR))
+
+
+def next_buffer_script():
+    """
+    The next script to render in buffer mode: a leftover pending_script.json
+    first, then the queue in date order.
+
+    Returns:
+        tuple: (script or None, whether it came from pending_script.json)
+    """
+    if PENDING_SCRIPT_FILE.exists():
+        return json.loads(PENDING_SCRIPT_FILE.read_text()), True
+    script = script_queue.take_next()
+    if script:
+        # Like promote_queued_script: a queued concept is dated (and logged)
+        # the day it's taken, not the day it was planned for
+        script["planned_date"] = script["date"]
+        script["date"] = date.today().isoformat()
+    return script, False
+
+
+def fill_buffer(client_factory, reference_paths, references):
+    """
+    Keep videos/ between the low and high watermarks: resume every
+    checkpointed buffer job, submit new ones from queued scripts if ready +
+    in-flight videos are below BUFFER_LOW, and poll them all from one thread.
+
+    Returns:
+        int: number of jobs that failed or are still unfinished
+    """
+    jobs = {}  # prompt hash -> (RegionalJob, script)
+    for record in load_operation_records():
+        if "script" not in record:
+            continue
+        age_hours = record_age_hours(record)
+        if age_hours is None or age_hours > OPERATION_MAX_AGE_HOURS:
+            print(f"ℹ️  Dropping expired Veo job for {record['script']['title']}")
+            clear_operation_checkpoint(record.get("prompt_hash"))
+            continue
+        script, prompt_hash = record["script"], record["prompt_hash"]
+        video_prompt, config_kwargs, _ = build_request(
+            script, reference_paths, references
+        )
+        job = regional_job(
+            client_factory, video_prompt, config_kwargs, prompt_hash, script
+        )
+        job.resume(record_operations(record))
+        jobs[prompt_hash] = (job, script)
+
+    ready = count_ready_videos()
+    print(
+        f"Buffer: {ready} video(s) ready, {len(jobs)} in flight "
+        f"(low {BUFFER_LOW}, high {BUFFER_HIGH})"
+    )
+    wanted = 0
+    if ready + len(jobs) < BUFFER_LOW:
+        wanted = min(BUFFER_HIGH - ready - len(jobs), BUFFER_MAX_JOBS - len(jobs))
+
+    problems = 0
+    for _ in range(wanted):
+        script, from_pending = next_buffer_script()
+        if not script:
+            print("⚠️  No scripts left to render; run generate_script.py --batch.")
+            problems += 1
+            break
+        missing = missing_script_fields(script)
+        if missing:
+            print(f"❌ Skipping script missing {missing}: {script}")
+            problems += 1
+            continue
+        video_prompt, config_kwargs, prompt_hash = build_request(
+            script, reference_paths, references
+        )
+        job = regional_job(
+            client_factory, video_prompt, config_kwargs, prompt_hash, script
+        )
+        try:
+            cached = response_cache.get_cache().get_path(prompt_hash, "Veo render")
+            if cached is None:
+                log_request(script)
+                job.launch()
+        except Exception as e:
+            print(f"❌ Veo submission failed ({e}); stopping submissions this run.")
+            if not from_pending:
+                script["date"] = script.pop("planned_date")
+                script_queue.save_queue(script_queue.load_queue() + [script])
+            problems += 1
+            break
+        if cached is not None:
+            store_video(script, iter_file_chunks(cached))
+            script_queue.record_in_history(script, key=HISTORY_KEY)
+        else:
+            jobs[prompt_hash] = (job, script)
+        # The checkpoint (or the finished video) owns the script now
+        if from_pending:
+            PENDING_SCRIPT_FILE.unlink()
+
+    if not jobs:
+        print("✓ No Veo jobs to wait on.")
+        return problems
+
+    # Poll every job from this one thread; each RegionalJob makes its own
+    # hedge and failover decisions as its results come in
+    poller = polling.Poller()
+    owners = {job: prompt_hash for prompt_hash, (job, _) in jobs.items()}
+    finished = []  # (prompt hash, outcome, error)
+    for job, prompt_hash in owners.items():
+        try:
+            job.start(poller)
+        except Exception as e:
+            finished.append((prompt_hash, None, e))
+    for key, result, error in poller:
+        job = key[0]
+        try:
+            outcome = job.handle(key, result, error)
+        except Exception as e:
+            finished.append((owners[job], None, e))
+            continue
+        if outcome is not None:
+            finished.append((owners[job], outcome, None))
+
+    for prompt_hash, outcome, error in finished:
+        script = jobs[prompt_hash][1]
+        if error:
+            # Keep the checkpoint: the next run re-attaches to the same jobs
+            print(f"❌ {script['title']}: {error}. Will resume next run.")
+            problems += 1
+            continue
+        _, client, operation = outcome
+        try:
+            video = generated_video(operation)
+        except RuntimeError as e:
+            print(f"❌ {script['title']}: {e}")
+            clear_operation_checkpoint(prompt_hash)
+            problems += 1
+            continue
+        try:
+            video_path = store_video(script, iter_video_chunks(client, video))
+        except Exception as e:
+            # The render exists; keep the checkpoint so the next run re-fetches it
+            print(f"❌ {script['title']}: saving the result failed ({e})")
+            problems += 1
+            continue
+        response_cache.get_cache().put_file(prompt_hash, video_path)
+        script_queue.record_in_history(script, key=HISTORY_KEY)
+        clear_operation_checkpoint(prompt_hash)
+    return problems
+
+
+def main():
+    buffer_mode = "--buffer" in sys.argv[1:] or os.getenv("VIDEO_BUFFER") == "1"
+    if not buffer_mode:
+        if not PENDING_SCRIPT_FILE.exists() and not promote_queued_script():
+            print(
+                "❌ No pending_script.json or queued script found. Run "
+                "generate_script.py first (nothing to generate)."
+            )
+            sys.exit(1)
+        script = json.loads(PENDING_SCRIPT_FILE.read_text())
+        for key in missing_script_fields(script):
+            print(f"❌ pending_script.json is missing '{key}'.")
+            sys.exit(1)
+
+    project = get_project_id()
+    if not project:
+        print(
+            "❌ No GCP project found. Set GOOGLE_APPLICATION_CREDENTIALS to your "
+            "service account key file (or set GOOGLE_CLOUD_PROJECT)."
+        )
+        sys.exit(1)
+    # Fail before paying for a render if the video state can't be recorded
+    try:
+        state_store.get_store()
+    except state_store.StateCorrupt as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    def client_factory(location):
+        return genai.Client(vertexai=True, project=project, location=location)
+
+    reference_paths = pick_reference_images()
+    references = [load_reference(p) for p in reference_paths]
+    if references:
+        print(f"Using {len(references)} reference image(s) from {RESOURCES_DIR}/")
+    else:
+        print("⚠️  No reference images found in resources/ — generating without them.")
+
+    if buffer_mode:
+        if fill_buffer(client_factory, reference_paths, references):
+            sys.exit(1)
+        return
+
+    video_prompt, config_kwargs, prompt_hash = build_request(
+        script, reference_paths, references
+    )
+    # An identical request already rendered: reuse it instead of paying again
+    try:
+        cached = response_cache.get_cache().get_path(prompt_hash, "Veo render")
+    except response_cache.CacheMiss as e:
+        print(f"❌ {e} (RESPONSE_CACHE=replay).")
+        sys.exit(1)
+    if cached is not None:
+        store_video(script, iter_file_chunks(cached))
+        PENDING_SCRIPT_FILE.unlink()
+        print("✓ Removed pending_script.json — generation complete.")
+        return
+
+    log_request(script)
+    job = regional_job(client_factory, video_prompt, config_kwargs, prompt_hash)
+    # Attach to jobs an earlier run already paid for, if there are any
+    job.resume(load_operation_checkpoint(prompt_hash))
+
+    # Drive the job (failing over and hedging across regions) until it finishes
+    try:
+        _, client, operation = job.run()
+    except polling.PollTimeout:
+        # Keep the checkpoint: the next run re-attaches to this same job
+        print(
+            "❌ Video generation timed out. The job is checkpointed in "
+            f"{PENDING_OPERATION_FILE}; the next run will resume it."
+        )
+        sys.exit(1)
+
+    try:
+        video = generated_video(operation)
+    except RuntimeError as e:
+        clear_operation_checkpoint(prompt_hash)
+        print(f"❌ {e}")
+        sys.exit(1)
+    video_path = store_video(script, iter_video_chunks(client, video))
+    response_cache.get_cache().put_file(prompt_hash, video_path)
 
     # The script has been fully consumed
+    clear_operation_checkpoint(prompt_hash)
     PENDING_SCRIPT_FILE.unlink()
     print("✓ Removed pending_script.json — generation complete.")
 
@@ -0,0 +1,192 @@
+"""
+Batch several repository changes into a single commit via the Git trees API.
+
+The contents API makes one commit per file change, so a posting run used to
+leave a trail of commits on main (hosting upload, hosting delete) that the
+workflow then had to rebase its own state commit over. A CommitBatch instead
+collects every change of the run — files to write, files to delete, files to
+move — and applies them as one atomic commit: one tree, one commit, one ref
+update. Files whose bytes the repo already holds (e.g. a video moving from
+videos/ to posted_archive/) are referenced by blob sha instead of re-uploaded.
+"""
+
+import base64
+import threading
+
+import transport
+from media_hosts import GITHUB_API, git_blob_sha
+
+# Ref updates race with other pushes; rebuild on the new head and retry
+COMMIT_ATTEMPTS = 3
+
+
+class CommitBatch:
+    """Staged repository changes, applied together by commit()."""
+
+    def __init__(self, token, repo, branch="main"):
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self._writes = {}  # repo path -> ("file", local path) | ("bytes", data)
+        self._deletes = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._writes) + len(self._deletes)
+
+    @property
+    def staged_deletes(self):
+        with self._lock:
+            return sorted(self._deletes)
+
+    def _headers(self):
+        return {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+
+    def _api(self, path):
+        return f"{GITHUB_API}/repos/{self.repo}/git/{path}"
+
+    def put_file(self, path, local_path):
+        """Stage a repo path to hold a local file's current bytes."""
+        with self._lock:
+            self._deletes.discard(path)
+            self._writes[path] = ("file", str(local_path))
+
+    def put_bytes(self, path, data):
+        """Stage a repo path to hold the given bytes."""
+        with self._lock:
+            self._deletes.discard(path)
+            self._writes[path] = ("bytes", data)
+
+    def delete(self, path):
+        """Stage a repo path for deletion (ignored if it doesn't exist)."""
+        with self._lock:
+            self._writes.pop(path, None)
+            self._deletes.add(path)
+
+    def _check(self, res, what):
+        if res.status_code not in (200, 201):
+            raise Exception(f"GitHub {what} failed: {res.text}")
+        return res.json()
+
+    def _create_blob(self, data):
+        res = transport.post(
+            self._api("blobs"),
+            headers=self._headers(),
+            json={
+                "content": base64.b64encode(data).decode("utf-8"),
+                "encoding": "base64",
+            },
+            idempotent=True,  # blobs are content-addressed
+            timeout=transport.UPLOAD_TIMEOUT,
+        )
+        return self._check(res, "blob creation")["sha"]
+
+    def _tree_entries(self, existing):
+        """Build tree entries for the staged changes against the current tree."""
+        known_shas = set(existing.values())
+        entries = []
+        for path, (kind, value) in sorted(self._writes.items()):
+            if kind == "file":
+                sha = git_blob_sha(value)
+                if sha not in known_shas:
+                    with open(value, "rb") as f:
+                        sha = self._create_blob(f.read())
+            else:
+                sha = self._create_blob(value)
+            if existing.get(path) != sha:
+                entries.append(
+                    {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+                )
+        for path in sorted(self._deletes):
+            if path in existing:
+                entries.append(
+                    {"path": path, "mode": "100644", "type": "blob", "sha": None}
+                )
+        return entries
+
+    def commit(self, message):
+        """
+        Apply every staged change as a single commit on the branch.
+
+        Returns:
+            str: the new commit sha, or None if there was nothing to change
+        """
+        with self._lock:
+            for attempt in range(1, COMMIT_ATTEMPTS + 1):
+                ref = self._check(
+                    transport.get(
+                        self._api(f"ref/heads/{self.branch}"), headers=self._headers()
+                    ),
+                    "ref lookup",
+                )
+                head_sha = ref["object"]["sha"]
+                head = self._check(
+                    transport.get(
+                        self._api(f"commits/{head_sha}"), headers=self._headers()
+                    ),
+                    "commit lookup",
+                )
+                tree = self._check(
+                    transport.get(
+                        self._api(f"trees/{head['tree']['sha']}"),
+                        headers=self._headers(),
+                        params={"recursive": "1"},
+                    ),
+                    "tree lookup",
+                )
+                existing = {
+                    item["path"]: item["sha"]
+                    for item in tree["tree"]
+                    if item["type"] == "blob"
+                }
+
+                entries = self._tree_entries(existing)
+                if not entries:
+                    print("ℹ️  Repository already up to date, no commit needed.")
+                    self._writes.clear()
+                    self._deletes.clear()
+                    return None
+
+                new_tree = self._check(
+                    transport.post(
+                        self._api("trees"),
+                        headers=self._headers(),
+                        json={"base_tree": head["tree"]["sha"], "tree": entries},
+                    ),
+                    "tree creation",
+                )
+                new_commit = self._check(
+                    transport.post(
+                        self._api("commits"),
+                        headers=self._headers(),
+                        json={
+                            "message": message,
+                            "tree": new_tree["sha"],
+                            "parents": [head_sha],
+                        },
+                    ),
+                    "commit creation",
+                )
+                res = transport.request(
+                    "PATCH",
+                    self._api(f"refs/heads/{self.branch}"),
+                    headers=self._headers(),
+                    json={"sha": new_commit["sha"], "force": False},
+                )
+                if res.status_code == 200:
+                    print(
+                        f"✓ Committed {len(entries)} change(s) to {self.branch} "
+                        f"in one commit ({new_commit['sha'][:7]})"
+                    )
+                    self._writes.clear()
+                    self._deletes.clear()
+                    return new_commit["sha"]
+                if res.status_code != 422 or attempt == COMMIT_ATTEMPTS:
+                    raise Exception(f"GitHub ref update failed: {res.text}")
+                print(
+                    f"ℹ️  {self.branch} moved while committing, "
+                    "rebuilding on the new head..."
+                )
@@ -0,0 +1,208 @@
+"""
+Append-only, month-segmented log of every concept Pip has made.
+
+Entries ({"date", "concept_summary", "title"}) live in one JSON Lines file per
+month of their date, history/<YYYY-MM>.jsonl, next to a small
+history/index.json that records each segment's entry count, byte size and
+date range. Recording today's concept appends one line to the current month
+(or, on a same-day rerun, rewrites only that month's segment), and the last N
+entries can be read from the newest segments alone — older months are never
+touched.
+
+The old single-file content_history.json is split into segments the first
+time the history is used, then removed.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Default when HISTORY_DIR is unset
+HISTORY_DIR = Path("history")
+LEGACY_FILE = Path("content_history.json")
+
+
+def history_dir():
+    return Path(os.getenv("HISTORY_DIR") or HISTORY_DIR)
+
+
+def _index_file():
+    return history_dir() / "index.json"
+
+
+def _segment_name(entry_date):
+    return f"{entry_date[:7]}.jsonl"
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def _read_segment(path):
+    entries = []
+    for number, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Most likely a line cut short by a crash mid-append
+            print(f"⚠️  Skipping unreadable line {number} of {path}")
+    return entries
+
+
+def _describe(path, entries):
+    dates = [e.get("date", "") for e in entries]
+    return {
+        "file": path.name,
+        "count": len(entries),
+        "bytes": path.stat().st_size,
+        "first": min(dates, default=""),
+        "last": max(dates, default=""),
+    }
+
+
+def _save_index(segments):
+    segments = sorted(segments, key=lambda s: s["file"])
+    index = {"total": sum(s["count"] for s in segments), "segments": segments}
+    _write_atomic(_index_file(), json.dumps(index, indent=2) + "\n")
+    return index
+
+
+def _migrate_legacy():
+    """Split content_history.json into monthly segments and remove it."""
+    try:
+        history = json.loads(LEGACY_FILE.read_text())
+    except json.JSONDecodeError:
+        print(f"⚠️  {LEGACY_FILE} is corrupt, not migrating it.")
+        return
+    folder = history_dir()
+    folder.mkdir(exist_ok=True)
+    months = {}
+    for entry in history:
+        months.setdefault(_segment_name(entry.get("date", "")), []).append(entry)
+    for name, entries in months.items():
+        _write_atomic(folder / name, "".join(json.dumps(e) + "\n" for e in entries))
+    LEGACY_FILE.unlink()
+    print(f"✓ Migrated {len(history)} concepts from {LEGACY_FILE} to {folder}/")
+
+
+def load_index():
+    """
+    The segment index, checked against the segment files on disk. A segment
+    whose size doesn't match (e.g. an append that crashed before the index
+    was updated), or that the index doesn't know about, is re-read.
+
+    Returns:
+        dict: {"total": int, "segments": [{"file", "count", "bytes",
+               "first", "last"}, ...]} with segments oldest first
+    """
+    index_file = _index_file()
+    if LEGACY_FILE.exists() and not index_file.exists():
+        _migrate_legacy()
+    if not history_dir().exists():
+        return {"total": 0, "segments": []}
+    known = {}
+    if index_file.exists():
+        try:
+            known = {
+                s["file"]: s for s in json.loads(index_file.read_text())["segments"]
+            }
+        except (json.JSONDecodeError, KeyError, TypeError):
+            print(f"⚠️  {index_file} is corrupt, rebuilding it.")
+    segments = []
+    stale = False
+    for path in sorted(history_dir().glob("*.jsonl")):
+        segment = known.get(path.name)
+        if segment is None or segment["bytes"] != path.stat().st_size:
+            segment = _describe(path, _read_segment(path))
+            stale = True
+        segments.append(segment)
+    if stale or len(segments) != len(known):
+        return _save_index(segments)
+    return {"total": sum(s["count"] for s in segments), "segments": segments}
+
+
+def read_all():
+    """Every recorded concept, oldest month first."""
+    entries = []
+    for segment in load_index()["segments"]:
+        entries.extend(_read_segment(history_dir() / segment["file"]))
+    return entries
+
+
+def read_segment(name):
+    """The concepts in one segment file (e.g. "2026-10.jsonl"), in order."""
+    return _read_segment(history_dir() / name)
+
+
+def tail(n, exclude_dates=()):
+    """
+    The last `n` recorded concepts (leaving out any dated `exclude_dates`),
+    reading only the newest segments.
+    """
+    entries = []
+    for segment in reversed(load_index()["segments"]):
+        if len(entries) >= n:
+            break
+        entries[:0] = [
+            e
+            for e in _read_segment(history_dir() / segment["file"])
+            if e.get("date") not in exclude_dates
+        ]
+    return entries[-n:] if n else []
+
+
+def record(entry, key=("date",)):
+    """
+    Log a concept under its date. Any existing entry that matches it on every
+    field in `key` (by default: the same date) is replaced (only its month's
+    segment is rewritten), so a same-day rerun doesn't create duplicates;
+    otherwise the entry is simply appended.
+
+    Returns:
+        int: the number of concepts in the history
+    """
+    index = load_index()
+    history_dir().mkdir(exist_ok=True)
+    path = history_dir() / _segment_name(entry["date"])
+    segments = [s for s in index["segments"] if s["file"] != path.name]
+    current = next((s for s in index["segments"] if s["file"] == path.name), None)
+    line = json.dumps(entry) + "\n"
+    if current and current["first"] <= entry["date"] <= current["last"]:
+        # The date may already be logged: rewrite just this month
+        entries = [
+            e
+            for e in _read_segment(path)
+            if any(e.get(field) != entry.get(field) for field in key)
+        ]
+        _write_atomic(path, "".join(json.dumps(e) + "\n" for e in entries) + line)
+        segments.append(_describe(path, entries + [entry]))
+    else:
+        if current and current["bytes"]:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line  # finish a line cut short by a crash
+        with open(path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if current is None:
+            segments.append(_describe(path, [entry]))
+        else:
+            segments.append(
+                dict(
+                    current,
+                    count=current["count"] + 1,
+                    bytes=path.stat().st_size,
+                    first=min(current["first"], entry["date"]),
+                    last=max(current["last"], entry["date"]),
+                )
+            )
+    return _save_index(segments)["total"]
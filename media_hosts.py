@@ -0,0 +1,475 @@
+"""
+Public hosting backends for Instagram ingestion.
+
+Instagram's Graph API won't accept a file upload: it needs a publicly
+downloadable video URL to fetch from. A media host takes a local video,
+makes it reachable at a public URL, and removes it again once every platform
+has posted.
+
+Backends (chosen with MEDIA_HOST):
+  - github-contents  (default) commits the video to instagram_videos/ through
+                     the contents API and serves it from raw.githubusercontent
+  - github-release   streams the file to a release asset on a dedicated tag —
+                     no base64, no commit to main, and a 2 GB size limit
+  - object-store     serves the video's own object in the object store
+                     (object_store.py, OBJECT_STORE=gcs) through a signed
+                     URL — no second copy is uploaded or committed
+  - local            serves videos straight from disk over a small HTTP
+                     server, for testing (set MEDIA_HOST_PUBLIC_URL when it
+                     sits behind a tunnel)
+"""
+
+import base64
+import hashlib
+import http.server
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import object_store
+import transport
+
+GITHUB_API = "https://api.github.com"
+GITHUB_UPLOADS = "https://uploads.github.com"
+
+
+def git_blob_sha(path, chunk_size=1024 * 1024):
+    """
+    Compute a file's git blob sha (sha1 of "blob <size>\\0" + content)
+    without loading it into memory — the same id GitHub reports for it.
+    """
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Stream a file's sha256 hex digest."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_served(url, expected_size, expected_sha256, chunk_size=1024 * 1024):
+    """
+    Check that a public URL currently serves exactly the expected bytes.
+
+    Fails fast on a 404 or a Content-Length mismatch (e.g. a CDN still holding
+    an older copy), otherwise streams the body through sha256.
+
+    Returns:
+        bool: True only if size and checksum both match
+    """
+    try:
+        res = transport.get(url, stream=True, attempts=1)
+        with res:
+            if res.status_code != 200:
+                return False
+            length = res.headers.get("Content-Length")
+            if length is not None and int(length) != expected_size:
+                return False
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in res.iter_content(chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+        return size == expected_size and digest.hexdigest() == expected_sha256
+    except Exception as e:
+        print(f"⚠️  Could not probe {url}: {e}")
+        return False
+
+
+class MediaHost(ABC):
+    """Interface every hosting backend implements."""
+
+    name = "base"
+    # Whether a published URL outlives this process (and so can be published
+    # ahead of time by generate_video.py)
+    persistent = True
+
+    def is_configured(self):
+        """Whether the backend has everything it needs to publish."""
+        return True
+
+    @abstractmethod
+    def publish(self, video_path):
+        """
+        Make a local video publicly reachable.
+
+        Returns:
+            str: public URL Instagram can download the video from
+        """
+
+    @abstractmethod
+    def remove(self, video_filename):
+        """
+        Take a hosted video down again.
+
+        Returns:
+            bool: True if removed (or already gone), False otherwise
+        """
+
+
+class GitHubContentsHost(MediaHost):
+    """Hosts videos in instagram_videos/ of the repo via the contents API."""
+
+    name = "github-contents"
+
+    def __init__(self, token, repo, branch="main", folder="instagram_videos"):
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self.folder = folder
+        # Optional github_commits.CommitBatch: when set, removals are staged
+        # into the run's single commit instead of committing one by one
+        self.batch = None
+
+    def is_configured(self):
+        return bool(self.token)
+
+    def _headers(self):
+        return {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+
+    def _api_url(self, video_filename):
+        return f"{GITHUB_API}/repos/{self.repo}/contents/{self.folder}/{video_filename}"
+
+    def raw_url(self, video_filename):
+        return (
+            f"https://raw.githubusercontent.com/{self.repo}/{self.branch}/"
+            f"{self.folder}/{video_filename}"
+        )
+
+    def publish(self, video_path):
+        if not self.token:
+            raise Exception("GitHub token not configured")
+
+        video_filename = Path(video_path).name
+        api_url = self._api_url(video_filename)
+        raw_url = self.raw_url(video_filename)
+
+        # Check if file already exists (to update instead of create). GitHub
+        # reports the git blob sha of what it holds, so if that matches the
+        # local file's blob sha the bytes are identical and the upload can be
+        # skipped — the common case when retrying after a partial failure.
+        check_response = transport.get(api_url, headers=self._headers())
+        remote_sha = None
+        if check_response.status_code == 200:
+            remote_sha = check_response.json()["sha"]
+            if remote_sha == git_blob_sha(video_path):
+                print(f"Video already hosted on GitHub (same blob): {raw_url}")
+                return raw_url
+
+        # Read video file and encode to base64 (the contents API only takes
+        # JSON bodies)
+        with open(video_path, "rb") as video_file:
+            encoded_content = base64.b64encode(video_file.read()).decode("utf-8")
+
+        commit_data = {
+            "message": f"Upload video for Instagram posting: {video_filename}",
+            "content": encoded_content,
+            "branch": self.branch,
+        }
+        if remote_sha:
+            # File exists, need to include sha for update
+            commit_data["sha"] = remote_sha
+
+        # Each PUT creates a commit against a specific sha, so it is not
+        # blindly retried (a repeat after a lost response would 409).
+        response = transport.put(
+            api_url,
+            headers=self._headers(),
+            json=commit_data,
+            idempotent=False,
+            timeout=transport.UPLOAD_TIMEOUT,
+        )
+        if response.status_code not in [200, 201]:
+            raise Exception(f"GitHub upload failed: {response.text}")
+
+        print(f"Video uploaded to GitHub: {raw_url}")
+        return raw_url
+
+    def remove(self, video_filename):
+        if not self.token:
+            print("⚠️  GitHub token not configured, skipping GitHub deletion")
+            return False
+
+        if self.batch is not None:
+            self.batch.delete(f"{self.folder}/{video_filename}")
+            print(f"✓ Staged deletion of {video_filename} from GitHub hosting")
+            return True
+
+        api_url = self._api_url(video_filename)
+        try:
+            # First, get the file's SHA (required for deletion)
+            check_response = transport.get(api_url, headers=self._headers())
+            if check_response.status_code == 404:
+                print(
+                    f"ℹ️  Video {video_filename} not found in GitHub repo, may have been already deleted"
+                )
+                return True  # Consider this a success since file doesn't exist
+            elif check_response.status_code != 200:
+                print(
+                    f"⚠️  Failed to check if video exists in GitHub: {check_response.text}"
+                )
+                return False
+
+            delete_data = {
+                "message": f"Delete posted video: {video_filename} [automated]",
+                "sha": check_response.json()["sha"],
+                "branch": self.branch,
+            }
+            delete_response = transport.delete(
+                api_url, headers=self._headers(), json=delete_data
+            )
+            if delete_response.status_code == 200:
+                print(f"✓ Successfully deleted {video_filename} from GitHub repository")
+                return True
+            print(f"⚠️  Failed to delete video from GitHub: {delete_response.text}")
+            return False
+        except Exception as e:
+            print(f"⚠️  Error deleting video from GitHub: {e}")
+            return False
+
+
+class GitHubReleaseHost(MediaHost):
+    """
+    Hosts videos as assets of a single GitHub release.
+
+    The file is streamed straight from disk as the request body, so memory
+    stays flat and there is no base64 inflation; nothing is committed to main.
+    """
+
+    name = "github-release"
+
+    def __init__(self, token, repo, tag="instagram-media"):
+        self.token = token
+        self.repo = repo
+        self.tag = tag
+
+    def is_configured(self):
+        return bool(self.token)
+
+    def _headers(self, **extra):
+        return {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github.v3+json",
+            **extra,
+        }
+
+    def _release(self):
+        """Fetch the hosting release, creating it on first use."""
+        url = f"{GITHUB_API}/repos/{self.repo}/releases/tags/{self.tag}"
+        res = transport.get(url, headers=self._headers())
+        if res.status_code == 200:
+            return res.json()
+        if res.status_code != 404:
+            raise Exception(f"GitHub release lookup failed: {res.text}")
+        res = transport.post(
+            f"{GITHUB_API}/repos/{self.repo}/releases",
+            headers=self._headers(),
+            json={
+                "tag_name": self.tag,
+                "name": "Instagram media hosting [automated]",
+                "body": "Temporary public copies of videos for Instagram ingestion.",
+                "prerelease": True,
+            },
+        )
+        if res.status_code != 201:
+            raise Exception(f"GitHub release creation failed: {res.text}")
+        return res.json()
+
+    def _find_asset(self, release, video_filename):
+        for asset in release.get("assets", []):
+            if asset["name"] == video_filename:
+                return asset
+        return None
+
+    def _delete_asset(self, asset):
+        res = transport.delete(
+            f"{GITHUB_API}/repos/{self.repo}/releases/assets/{asset['id']}",
+            headers=self._headers(),
+        )
+        return res.status_code in (204, 404)
+
+    def publish(self, video_path):
+        if not self.token:
+            raise Exception("GitHub token not configured")
+
+        video_filename = Path(video_path).name
+        release = self._release()
+        existing = self._find_asset(release, video_filename)
+        if existing:
+            # Asset names are unique per release: replace the old copy
+            self._delete_asset(existing)
+
+        upload_url = (
+            f"{GITHUB_UPLOADS}/repos/{self.repo}/releases/{release['id']}/assets"
+            f"?name={quote(video_filename)}"
+        )
+        with open(video_path, "rb") as video_file:
+            res = transport.post(
+                upload_url,
+                headers=self._headers(
+                    **{
+                        "Content-Type": "video/mp4",
+                        "Content-Length": str(os.path.getsize(video_path)),
+                    }
+                ),
+                data=video_file,
+                timeout=transport.UPLOAD_TIMEOUT,
+            )
+        if res.status_code != 201:
+            raise Exception(f"GitHub release asset upload failed: {res.text}")
+
+        url = res.json()["browser_download_url"]
+        print(f"Video uploaded to GitHub release '{self.tag}': {url}")
+        return url
+
+    def remove(self, video_filename):
+        if not self.token:
+            print("⚠️  GitHub token not configured, skipping release asset deletion")
+            return False
+        try:
+            asset = self._find_asset(self._release(), video_filename)
+            if asset is None:
+                print(f"ℹ️  No release asset for {video_filename}, nothing to delete")
+                return True
+            if self._delete_asset(asset):
+                print(f"✓ Deleted release asset {video_filename}")
+                return True
+            print(f"⚠️  Failed to delete release asset {video_filename}")
+            return False
+        except Exception as e:
+            print(f"⚠️  Error deleting release asset: {e}")
+            return False
+
+
+class ObjectStoreHost(MediaHost):
+    """
+    Serves a video from the object store, where it is already kept under its
+    sha256: the hosting copy is the stored object itself, reached through a
+    signed URL that lasts up to 7 days (an expired one fails the posting
+    run's is_served() check and is simply signed again).
+    """
+
+    name = "object-store"
+
+    def is_configured(self):
+        return isinstance(object_store.get_object_store(), object_store.GCSStore)
+
+    def publish(self, video_path):
+        store = object_store.get_object_store()
+        pointer = object_store.read_pointer(video_path)
+        if pointer is not None:
+            sha256 = pointer["sha256"]
+        else:
+            # Queued before the object store: store it now (a no-op later)
+            sha256 = file_sha256(video_path)
+            store.put(video_path, sha256)
+        url = store.signed_url(sha256)
+        if url is None:
+            raise Exception(f"Object store '{store.name}' can't serve public URLs")
+        print(f"Video served from the object store ({sha256[:12]})")
+        return url
+
+    def remove(self, video_filename):
+        # Nothing to take down: the object belongs to the store, and
+        # retention.py deletes it along with the archived pointer
+        return True
+
+
+class LocalHTTPHost(MediaHost):
+    """
+    Serves published videos from their current location on disk over HTTP.
+
+    Meant for local testing: nothing is copied, the server only maps file
+    names to paths. Instagram can only reach it through a public tunnel, whose
+    base URL goes in MEDIA_HOST_PUBLIC_URL.
+    """
+
+    name = "local"
+    persistent = False
+
+    def __init__(self, bind="127.0.0.1:8765", public_url=None):
+        host, _, port = bind.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.public_url = public_url
+        self._files = {}
+        self._server = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._server:
+                return
+            files = self._files
+
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    path = files.get(unquote(self.path.lstrip("/")))
+                    if path is None or not path.exists():
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "video/mp4")
+                    self.send_header("Content-Length", str(path.stat().st_size))
+                    self.end_headers()
+                    with open(path, "rb") as f:
+                        shutil.copyfileobj(f, self.wfile)
+
+                def log_message(self, format, *args):
+                    """Suppress log messages."""
+                    pass
+
+            self._server = http.server.ThreadingHTTPServer(self.address, Handler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            print(f"Local media host listening on {self.address[0]}:{self.address[1]}")
+
+    def publish(self, video_path):
+        self._start()
+        video_filename = Path(video_path).name
+        self._files[video_filename] = Path(video_path).resolve()
+        base = self.public_url or f"http://{self.address[0]}:{self.address[1]}"
+        url = f"{base.rstrip('/')}/{quote(video_filename)}"
+        print(f"Video served locally: {url}")
+        return url
+
+    def remove(self, video_filename):
+        self._files.pop(video_filename, None)
+        return True
+
+
+def get_media_host(name=None):
+    """
+    Build the hosting backend selected by MEDIA_HOST (or `name`).
+
+    Environment is read at call time so values loaded from .env by the calling
+    script are picked up.
+    """
+    name = name or os.getenv("MEDIA_HOST", "github-contents")
+    token = os.getenv("GITHUB_TOKEN")
+    repo = os.getenv("GITHUB_REPO", "moe-a11y/Pips_Projects")
+    if name == "github-contents":
+        return GitHubContentsHost(token, repo)
+    if name == "github-release":
+        return GitHubReleaseHost(
+            token, repo, tag=os.getenv("MEDIA_RELEASE_TAG", "instagram-media")
+        )
+    if name == "object-store":
+        return ObjectStoreHost()
+    if name == "local":
+        return LocalHTTPHost(
+            bind=os.getenv("MEDIA_HOST_BIND", "127.0.0.1:8765"),
+            public_url=os.getenv("MEDIA_HOST_PUBLIC_URL"),
+        )
+    raise ValueError(f"Unknown MEDIA_HOST '{name}'")
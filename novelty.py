@@ -0,0 +1,353 @@
+"""
+Local novelty index over the concept history (history_store.py).
+
+Every past concept_summary is turned into a bag of hashed word and word-pair
+features, and candidates are scored against the whole history by TF-IDF
+cosine similarity. Words every concept shares ("Pip uses the Mystical Press
+on...", "magical", "sparkly") get almost no weight, so the score is driven by
+the object and outcome — what actually makes two videos feel like repeats.
+Synonyms for the show's recurring themes (squishy fidget toys, fireworks,
+meteors, glitter) are folded into one word first, so a repeat phrased
+differently still shares its features.
+
+Calibration (history/ as of 2026-08-20, each entry scored against the ones
+before it): the near-repeats there score 0.20-0.25 against their nearest
+match (07-12 and 07-25, squishy fidget toys bulging against 07-10; 08-13,
+Perseid meteor, against 08-07) while unrelated concepts stay below 0.16.
+0.20 / 0.12 flags exactly those three, plus 07-19, a second ice-cream
+press after 07-06. Lowering the theme threshold to 0.10 starts flagging
+distinct concepts (08-19, a toy airplane), and raising the single-match one
+to 0.25 lets 07-12 through. The one labelled repeat still missed is 07-11
+(macarons in a firework-like shower) against 07-05 (a candy firecracker) at
+0.11.
+
+The features are kept in a compact array-backed file (.cache/novelty_index.bin)
+that is extended a history segment at a time: segments whose size hasn't
+changed since the last run are neither read nor tokenized, so normally only
+the current month is. If an older segment changed, the index is rebuilt from
+that segment on.
+"""
+
+import json
+import math
+import os
+import re
+import struct
+import zlib
+from array import array
+from pathlib import Path
+
+import history_store
+
+# Default for NOVELTY_INDEX_FILE
+INDEX_FILE = Path(".cache/novelty_index.bin")
+MAGIC = b"PNV3"
+
+# A candidate this similar to any single past concept is a repeat
+# (NOVELTY_THRESHOLD overrides it, read on every check)...
+NOVELTY_THRESHOLD = 0.2
+# ...and so is one moderately similar to several (a theme that keeps coming
+# back; NOVELTY_THEME_THRESHOLD)
+THEME_THRESHOLD = 0.12
+THEME_MAX_MATCHES = 2
+
+# Grammar words and the show's own boilerplate, which say nothing about the idea
+STOPWORDS = set(
+    """
+    a an the and or of to in on at for by with into onto out as is it its itself
+    which while that this then before after from under inside beneath both same
+    each one two his her their so up down off over than very
+    pip pips use uses used press presses pressed pressing place places placed
+    mystical machine causing causes cause celebrate celebrates celebrating
+    celebration honor national day international world
+    """.split()
+)
+
+
+# Words for the same theme or outcome, folded into one feature so that a
+# "NeeDoh stress ball" matches a "squishy fidget toy" and a "candy rocket" a
+# "candy firecracker" (applied after de-pluralising)
+SYNONYMS = {
+    "fidget": "squishy",
+    "needoh": "squishy",
+    "stress": "squishy",
+    "firecracker": "firework",
+    "rocket": "firework",
+    "sparkler": "firework",
+    "meteor": "star",
+    "stardust": "star",
+    "comet": "star",
+    "glittery": "glitter",
+    "glittering": "glitter",
+    "sparkly": "sparkle",
+    "sparkling": "sparkle",
+    "bulging": "bulge",
+    "popping": "pop",
+    "popped": "pop",
+    "burst": "pop",
+    "bursting": "pop",
+}
+
+
+def tokenize(text):
+    """
+    Content words (crudely de-pluralised, synonyms folded) plus adjacent
+    word pairs.
+    """
+    words = []
+    for word in re.findall(r"[a-z]+", text.lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        word = SYNONYMS.get(word, word)
+        if len(word) > 1 and word not in STOPWORDS:
+            words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _feature(token):
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def features(text):
+    """Hashed feature id -> count for a piece of text."""
+    counts = {}
+    for token in tokenize(text):
+        fid = _feature(token)
+        counts[fid] = counts.get(fid, 0) + 1
+    return counts
+
+
+class NoveltyIndex:
+    """
+    Feature arrays for every history entry, plus an in-memory TF-IDF
+    inverted index for scoring.
+
+    On disk: magic, entry count, the arrays `offsets` (entry i's features are
+    ids/counts[offsets[i]:offsets[i+1]]), `ids` (uint32) and `counts`
+    (uint16), then the history segments they were built from as JSON
+    ({"file", "bytes", "count"}, oldest first), so a segment whose size is
+    unchanged is never read again.
+    """
+
+    def __init__(self):
+        self.offsets = array("I", [0])
+        self.ids = array("I")
+        self.counts = array("H")
+        self.segments = []
+        # Entries scored alongside the history (queued and batch scripts);
+        # kept in memory only, after the history's entries
+        self.extra = []
+        self._segment_entries = {}
+        self._postings = None
+        self._idf = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def history_size(self):
+        return sum(s["count"] for s in self.segments)
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or index_file()
+        index = cls()
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return index
+        if data[:4] != MAGIC:
+            print(f"ℹ️  {path} is not a current novelty index, rebuilding it.")
+            return index
+        try:
+            (n,) = struct.unpack_from("<I", data, 4)
+            pos = 8
+            offsets = array("I")
+            offsets.frombytes(data[pos : pos + (n + 1) * offsets.itemsize])
+            pos += (n + 1) * offsets.itemsize
+            total = offsets[-1]
+            ids = array("I")
+            ids.frombytes(data[pos : pos + total * ids.itemsize])
+            pos += total * ids.itemsize
+            counts = array("H")
+            counts.frombytes(data[pos : pos + total * counts.itemsize])
+            pos += total * counts.itemsize
+            segments = json.loads(data[pos:])
+        except (struct.error, ValueError, IndexError):
+            print(f"⚠️  {path} is corrupt, rebuilding it.")
+            return index
+        if (
+            len(offsets) != n + 1
+            or len(ids) != total
+            or len(counts) != total
+            or sum(s["count"] for s in segments) != n
+        ):
+            print(f"⚠️  {path} is truncated, rebuilding it.")
+            return index
+        index.offsets, index.ids, index.counts = offsets, ids, counts
+        index.segments = segments
+        return index
+
+    def save(self, path=None):
+        path = Path(path or index_file())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        history_size = self.history_size
+        end = self.offsets[history_size]
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", history_size))
+            f.write(self.offsets[: history_size + 1].tobytes())
+            f.write(self.ids[:end].tobytes())
+            f.write(self.counts[:end].tobytes())
+            f.write(json.dumps(self.segments).encode("utf-8"))
+        os.replace(tmp, path)
+
+    def _truncate(self, n):
+        end = self.offsets[n]
+        del self.offsets[n + 1 :]
+        del self.ids[end:]
+        del self.counts[end:]
+
+    def _append(self, entry):
+        counts = features(entry.get("concept_summary", ""))
+        for fid, count in sorted(counts.items()):
+            self.ids.append(fid)
+            self.counts.append(min(count, 0xFFFF))
+        self.offsets.append(len(self.ids))
+
+    def sync_history(self):
+        """
+        Bring the index in line with history/, reading only the segments
+        that changed since it was built (normally just the current month).
+
+        Returns:
+            int: how many history entries were added, replaced or dropped
+        """
+        segments = history_store.load_index()["segments"]
+        previous = self.history_size
+        keep = 0
+        for mine, theirs in zip(self.segments, segments):
+            if (mine["file"], mine["bytes"]) != (theirs["file"], theirs["bytes"]):
+                break
+            keep += 1
+        kept = sum(s["count"] for s in self.segments[:keep])
+        self._truncate(kept)
+        self.segments = self.segments[:keep]
+        for segment in segments[keep:]:
+            entries = history_store.read_segment(segment["file"])
+            for entry in entries:
+                self._append(entry)
+            self._segment_entries[segment["file"]] = entries
+            self.segments.append(
+                {
+                    "file": segment["file"],
+                    "bytes": segment["bytes"],
+                    "count": len(entries),
+                }
+            )
+        self.extra = []
+        self._postings = None
+        return (previous - kept) + (self.history_size - kept)
+
+    def set_extra(self, entries):
+        """Score candidates against `entries` too, on top of the history."""
+        self._truncate(self.history_size)
+        for entry in entries:
+            self._append(entry)
+        self.extra = list(entries)
+        self._postings = None
+
+    def entry(self, doc):
+        """The history (or extra) entry behind document number `doc`."""
+        if doc >= self.history_size:
+            return self.extra[doc - self.history_size]
+        for segment in self.segments:
+            if doc < segment["count"]:
+                name = segment["file"]
+                if name not in self._segment_entries:
+                    self._segment_entries[name] = history_store.read_segment(name)
+                return self._segment_entries[name][doc]
+            doc -= segment["count"]
+        return {}
+
+    def _build(self):
+        """Derive IDF weights and the normalised inverted index from the arrays."""
+        n = len(self)
+        df = {}
+        for fid in self.ids:
+            df[fid] = df.get(fid, 0) + 1
+        self._idf = {fid: math.log((n + 1) / (d + 1)) + 1e-6 for fid, d in df.items()}
+        postings = {}
+        for doc in range(n):
+            start, end = self.offsets[doc], self.offsets[doc + 1]
+            weights = [
+                (fid, (1 + math.log(count)) * self._idf[fid])
+                for fid, count in zip(self.ids[start:end], self.counts[start:end])
+            ]
+            norm = math.sqrt(sum(w * w for _, w in weights)) or 1.0
+            for fid, w in weights:
+                postings.setdefault(fid, []).append((doc, w / norm))
+        self._postings = postings
+
+    def _vector(self, text):
+        weights = {
+            fid: (1 + math.log(count)) * self._idf.get(fid, math.log(len(self) + 1))
+            for fid, count in features(text).items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {fid: w / norm for fid, w in weights.items()}
+
+    def neighbours(self, text, k=5, exclude_dates=()):
+        """
+        The k past concepts most similar to `text`.
+
+        Returns:
+            list: (similarity, history entry) pairs, most similar first
+        """
+        if self._postings is None:
+            self._build()
+        scores = {}
+        for fid, weight in self._vector(text).items():
+            for doc, doc_weight in self._postings.get(fid, ()):
+                scores[doc] = scores.get(doc, 0.0) + weight * doc_weight
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        result = []
+        for doc, score in ranked:
+            entry = self.entry(doc)
+            if entry.get("date") in exclude_dates:
+                continue
+            result.append((score, entry))
+            if len(result) == k:
+                break
+        return result
+
+    def check(self, text, exclude_dates=()):
+        """
+        Decide whether a candidate concept is a near-repeat.
+
+        Returns:
+            tuple: (is_novel, neighbours) — neighbours as from neighbours()
+        """
+        threshold = float(os.getenv("NOVELTY_THRESHOLD", NOVELTY_THRESHOLD))
+        theme = float(os.getenv("NOVELTY_THEME_THRESHOLD", THEME_THRESHOLD))
+        near = self.neighbours(text, k=5, exclude_dates=exclude_dates)
+        if near and near[0][0] >= threshold:
+            return False, near
+        themed = [n for n in near if n[0] >= theme]
+        return len(themed) < THEME_MAX_MATCHES, near
+
+
+def index_file():
+    return Path(os.getenv("NOVELTY_INDEX_FILE") or INDEX_FILE)
+
+
+def load_index(path=None):
+    """Load the on-disk index, bring it up to date with history/ and persist it."""
+    path = path or index_file()
+    index = NoveltyIndex.load(path)
+    if index.sync_history():
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"⚠️  Could not save novelty index ({e}), continuing in memory.")
+    return index
@@ -0,0 +1,441 @@
+"""
+External object storage for generated videos, so none of them go into git.
+
+A video is put in the object store under its sha256, and only a small
+pointer record is committed where the video used to be:
+videos/pip_<date>.mp4.ptr holds {"sha256", "size"}. The .mp4 next to it is a
+local, gitignored copy; a checkout that doesn't have one (e.g. the posting
+run in CI) fetches it from the store and checks the hash on the way in.
+Archiving moves the pointer to posted_archive/, and retention.py deletes the
+stored object when it prunes the pointer. The Instagram hosting copy can be
+the stored object too (MEDIA_HOST=object-store serves it through a signed
+URL), so a video's bytes are kept exactly once, under its sha256.
+
+Backends (chosen with OBJECT_STORE):
+  - local  (default) a directory, OBJECT_STORE_DIR (default .media/store) —
+           for testing, or a machine that runs both generation and posting
+  - gcs    a Cloud Storage bucket, OBJECT_STORE_BUCKET, under
+           OBJECT_STORE_PREFIX (default "videos/"), using the same Google
+           credentials as Veo
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+import transport
+
+POINTER_SUFFIX = ".ptr"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".avi", ".webm", ".mkv")
+CHUNK_SIZE = 1024 * 1024
+# Longest lifetime Cloud Storage allows for a V4 signed URL (7 days)
+SIGNED_URL_SECONDS = 7 * 24 * 3600
+
+
+class ObjectMissing(Exception):
+    """The store has no object for a pointer's sha256."""
+
+
+class ObjectStore(ABC):
+    """Interface every storage backend implements. Objects are keyed by sha256."""
+
+    name = "base"
+
+    @abstractmethod
+    def put(self, path, sha256):
+        """
+        Store a file's bytes under `sha256` (a no-op if already stored with
+        the same size), checking what was stored before returning.
+
+        Raises:
+            RuntimeError: if the upload failed or the stored object doesn't
+                          match the file
+        """
+
+    @abstractmethod
+    def get(self, sha256, dest):
+        """
+        Download an object to the open binary file `dest`.
+
+        Raises:
+            ObjectMissing: if there is no such object
+        """
+
+    @abstractmethod
+    def exists(self, sha256, size=None):
+        """Whether the object is stored (with exactly `size` bytes, if given)."""
+
+    @abstractmethod
+    def delete(self, sha256):
+        """
+        Returns:
+            bool: True if deleted (or already gone), False otherwise
+        """
+
+    def signed_url(self, sha256, expires=SIGNED_URL_SECONDS):
+        """
+        A time-limited public URL serving an object.
+
+        Returns:
+            str: the URL, or None if this backend can't serve one
+        """
+        return None
+
+
+class LocalDirStore(ObjectStore):
+    name = "local"
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, sha256):
+        return self.root / sha256[:2] / sha256
+
+    def put(self, path, sha256):
+        target = self._path(sha256)
+        if self.exists(sha256, os.path.getsize(path)):
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            try:
+                # Same filesystem: share the bytes with the local copy (videos
+                # are replaced, never edited in place, so this is safe)
+                os.close(fd)
+                os.unlink(tmp)
+                os.link(path, tmp)
+            except OSError:
+                with open(tmp, "wb") as f, open(path, "rb") as src:
+                    shutil.copyfileobj(src, f, CHUNK_SIZE)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def get(self, sha256, dest):
+        try:
+            with open(self._path(sha256), "rb") as src:
+                shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        except FileNotFoundError:
+            raise ObjectMissing(f"No object {sha256[:12]} in {self.root}")
+
+    def exists(self, sha256, size=None):
+        try:
+            stored = self._path(sha256).stat().st_size
+        except FileNotFoundError:
+            return False
+        return size is None or stored == size
+
+    def delete(self, sha256):
+        self._path(sha256).unlink(missing_ok=True)
+        return True
+
+
+class GCSStore(ObjectStore):
+    """Objects in a Cloud Storage bucket, through the JSON API."""
+
+    name = "gcs"
+    API = "https://storage.googleapis.com/storage/v1"
+    UPLOAD_API = "https://storage.googleapis.com/upload/storage/v1"
+
+    def __init__(self, bucket, prefix="videos/"):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._credentials = None
+
+    def _headers(self):
+        import google.auth
+        from google.auth.transport.requests import Request
+
+        if self._credentials is None:
+            self._credentials, _ = google.auth.default(
+                scopes=["https://www.googleapis.com/auth/devstorage.read_write"]
+            )
+        if not self._credentials.valid:
+            self._credentials.refresh(Request())
+        return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    def _object_url(self, sha256):
+        name = quote(f"{self.prefix}{sha256}", safe="")
+        return f"{self.API}/b/{self.bucket}/o/{name}"
+
+    def put(self, path, sha256):
+        size = os.path.getsize(path)
+        if self.exists(sha256, size):
+            return
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                md5.update(chunk)
+        with open(path, "rb") as f:
+            # Content-addressed, so re-sending after a dropped response is
+            # safe (transport rewinds the file before each retry)
+            res = transport.post(
+                f"{self.UPLOAD_API}/b/{self.bucket}/o",
+                params={"uploadType": "media", "name": f"{self.prefix}{sha256}"},
+                headers={**self._headers(), "Content-Type": "video/mp4"},
+                data=f,
+                timeout=transport.UPLOAD_TIMEOUT,
+                idempotent=True,
+            )
+        if res.status_code != 200:
+            raise RuntimeError(
+                f"Uploading {sha256[:12]} to gs://{self.bucket} failed: "
+                f"{res.status_code} {res.text[:200]}"
+            )
+        stored = res.json()
+        expected_md5 = base64.b64encode(md5.digest()).decode()
+        if int(stored.get("size", -1)) != size or stored.get("md5Hash") != expected_md5:
+            # Never leave a bad object behind under the video's hash
+            self.delete(sha256)
+            raise RuntimeError(
+                f"gs://{self.bucket} stored {stored.get('size')} bytes for "
+                f"{sha256[:12]} (expected {size}) or a different md5"
+            )
+
+    def get(self, sha256, dest):
+        res = transport.get(
+            self._object_url(sha256),
+            params={"alt": "media"},
+            headers=self._headers(),
+            stream=True,
+            timeout=transport.UPLOAD_TIMEOUT,
+        )
+        with res:
+            if res.status_code == 404:
+                raise ObjectMissing(f"No object {sha256[:12]} in gs://{self.bucket}")
+            if res.status_code != 200:
+                raise RuntimeError(
+                    f"Downloading {sha256[:12]} from gs://{self.bucket} failed: "
+                    f"{res.status_code}"
+                )
+            for chunk in res.iter_content(CHUNK_SIZE):
+                dest.write(chunk)
+
+    def exists(self, sha256, size=None):
+        res = transport.get(self._object_url(sha256), headers=self._headers())
+        if res.status_code not in (200, 404):
+            raise RuntimeError(
+                f"Checking {sha256[:12]} in gs://{self.bucket} failed: "
+                f"{res.status_code}"
+            )
+        if res.status_code == 404:
+            return False
+        return size is None or int(res.json().get("size", -1)) == size
+
+    def signed_url(self, sha256, expires=SIGNED_URL_SECONDS):
+        """
+        A V4 signed GET URL for the object, signed locally with the
+        credentials' key.
+
+        Raises:
+            RuntimeError: if the credentials can't sign (not a service account)
+        """
+        self._headers()  # load the credentials
+        credentials = self._credentials
+        email = getattr(credentials, "service_account_email", None)
+        if email is None or not hasattr(credentials, "sign_bytes"):
+            raise RuntimeError(
+                "Signing object store URLs needs service-account credentials"
+            )
+        now = datetime.now(timezone.utc)
+        stamp = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{now:%Y%m%d}/auto/storage/goog4_request"
+        path = f"/{self.bucket}/{quote(self.prefix + sha256, safe='/~')}"
+        query = "&".join(
+            f"{key}={quote(value, safe='')}"
+            for key, value in sorted(
+                {
+                    "X-Goog-Algorithm": "GOOG4-RSA-SHA256",
+                    "X-Goog-Credential": f"{email}/{scope}",
+                    "X-Goog-Date": stamp,
+                    "X-Goog-Expires": str(int(expires)),
+                    "X-Goog-SignedHeaders": "host",
+                }.items()
+            )
+        )
+        canonical_request = "\n".join(
+            [
+                "GET",
+                path,
+                query,
+                "host:storage.googleapis.com",
+                "",
+                "host",
+                "UNSIGNED-PAYLOAD",
+            ]
+        )
+        string_to_sign = "\n".join(
+            [
+                "GOOG4-RSA-SHA256",
+                stamp,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        signature = credentials.sign_bytes(string_to_sign.encode()).hex()
+        return (
+            f"https://storage.googleapis.com{path}?{query}"
+            f"&X-Goog-Signature={signature}"
+        )
+
+    def delete(self, sha256):
+        res = transport.delete(self._object_url(sha256), headers=self._headers())
+        if res.status_code in (200, 204, 404):
+            return True
+        print(
+            f"⚠️  Could not delete {sha256[:12]} from gs://{self.bucket}: "
+            f"{res.status_code}"
+        )
+        return False
+
+
+_store = None
+
+
+def get_object_store(name=None):
+    """
+    Build the backend selected by OBJECT_STORE (or `name`).
+
+    Environment is read at call time so values loaded from .env by the calling
+    script are picked up; without `name` the instance is shared per process.
+    """
+    global _store
+    if name is None and _store is not None:
+        return _store
+    name = name or os.getenv("OBJECT_STORE", "local")
+    if name == "local":
+        store = LocalDirStore(os.getenv("OBJECT_STORE_DIR", ".media/store"))
+    elif name == "gcs":
+        bucket = os.getenv("OBJECT_STORE_BUCKET")
+        if not bucket:
+            raise ValueError("OBJECT_STORE=gcs needs OBJECT_STORE_BUCKET")
+        store = GCSStore(bucket, prefix=os.getenv("OBJECT_STORE_PREFIX", "videos/"))
+    else:
+        raise ValueError(f"Unknown OBJECT_STORE '{name}'")
+    if _store is None:
+        _store = store
+    return store
+
+
+def pointer_path(video_path):
+    video_path = Path(video_path)
+    return video_path.with_name(video_path.name + POINTER_SUFFIX)
+
+
+def read_pointer(video_path):
+    """
+    Returns:
+        dict: {"sha256", "size"} for the video, or None if it has no pointer
+    """
+    path = pointer_path(video_path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_pointer(video_path, sha256, size):
+    path = pointer_path(video_path)
+    data = json.dumps({"sha256": sha256, "size": size}, indent=2) + "\n"
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+    return path
+
+
+def upload(video_path, sha256, size):
+    """
+    Put a local video in the object store and write its pointer.
+
+    Returns:
+        Path: the pointer file, which is what gets committed
+    """
+    get_object_store().put(video_path, sha256)
+    path = write_pointer(video_path, sha256, size)
+    print(f"✓ Stored {Path(video_path).name} in the object store ({sha256[:12]})")
+    return path
+
+
+def list_videos(folder):
+    """
+    Video filenames in `folder`, from pointers and local copies alike.
+
+    Returns:
+        list: sorted paths of the videos (which may not be on disk yet)
+    """
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    names = set()
+    for path in folder.iterdir():
+        name = path.name
+        if name.endswith(POINTER_SUFFIX):
+            name = name[: -len(POINTER_SUFFIX)]
+        if not name.startswith(".") and name.lower().endswith(VIDEO_EXTENSIONS):
+            names.add(name)
+    return sorted(folder / name for name in names)
+
+
+def fetch(video_path):
+    """
+    Make sure the video a pointer names is on disk, downloading it from the
+    object store if there's no local copy of the right size. Downloads are
+    checked against the pointer's sha256 before they're renamed into place.
+    A video without a pointer (queued before the object store) is left as is.
+
+    Returns:
+        Path: the local video
+
+    Raises:
+        ObjectMissing: if the store has lost the object
+        RuntimeError: if the download doesn't match the pointer's hash
+    """
+    video_path = Path(video_path)
+    pointer = read_pointer(video_path)
+    if pointer is None:
+        return video_path
+    if video_path.exists() and video_path.stat().st_size == pointer["size"]:
+        return video_path
+    print(f"Fetching {video_path.name} from the object store...")
+    digest = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=video_path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            get_object_store().get(pointer["sha256"], _HashingWriter(f, digest))
+            f.flush()
+            os.fsync(f.fileno())
+        if digest.hexdigest() != pointer["sha256"]:
+            raise RuntimeError(
+                f"{video_path.name} from the object store doesn't match its "
+                f"pointer (got {digest.hexdigest()[:12]}, "
+                f"expected {pointer['sha256'][:12]})"
+            )
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, video_path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    print(f"✓ Fetched {video_path} ({pointer['size'] / 1e6:.1f} MB)")
+    return video_path
+
+
+class _HashingWriter:
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
@@ -0,0 +1,149 @@
+"""
+Adaptive polling for long-running remote operations.
+
+Used for the Veo generation operations (veo_regions.py, including every
+buffer-mode job at once from generate_video.py) and the Instagram container /
+Facebook Reel processing checks (post_script.py). Instead of a fixed sleep
+between checks, each operation gets a PollPolicy: the first check is timed to
+the operation's typical latency, later checks back off exponentially with
+jitter up to a ceiling, and an overall deadline bounds the wait. Several
+operations can be polled at once from a single thread, and a Poller's set of
+operations can change while it runs (a Veo hedge or failover adds a job).
+
+A check function returns None while the operation is still pending and any
+other value once it has finished; raising aborts the poll.
+"""
+
+import heapq
+import itertools
+import random
+import time
+from typing import NamedTuple
+
+
+class PollTimeout(Exception):
+    """Raised when an operation hasn't finished before its deadline."""
+
+
+class PollPolicy(NamedTuple):
+    # Seconds before the first check — set near the operation's typical latency
+    first_delay: float
+    # Delay after the first check, grown by `multiplier` each time up to
+    # `max_interval`
+    interval: float
+    max_interval: float
+    multiplier: float = 1.5
+    # Each delay is randomly scaled by ±jitter so concurrent polls spread out
+    jitter: float = 0.2
+    # Overall deadline in seconds from the start of polling
+    timeout: float = 300
+
+
+def _jittered(delay, jitter):
+    return max(0.0, delay * random.uniform(1 - jitter, 1 + jitter))
+
+
+class Poller:
+    """
+    Polls a changing set of operations from one thread.
+
+    Operations can be added or discarded between results, e.g. by the code
+    handling another operation's result. Keys must be hashable; re-adding a
+    key replaces its earlier operation.
+    """
+
+    def __init__(self):
+        self._queue = []
+        self._order = itertools.count()  # tie-breaker so keys never get compared
+        self._live = {}  # key -> id of its current queue entry
+
+    def __len__(self):
+        return len(self._live)
+
+    def add(self, key, check, policy):
+        """Start polling `check` under `policy`, its deadline counted from now."""
+        now = time.monotonic()
+        entry = next(self._order)
+        self._live[key] = entry
+        due = now + _jittered(policy.first_delay, policy.jitter)
+        heapq.heappush(
+            self._queue,
+            (due, entry, key, check, policy, policy.interval, now),
+        )
+
+    def discard(self, key):
+        """Stop polling `key` (a no-op if it isn't being polled)."""
+        self._live.pop(key, None)
+
+    def __iter__(self):
+        """
+        Yields:
+            tuple: (key, result, error) as each operation finishes, times out
+                   (error is a PollTimeout) or fails (error is the exception)
+        """
+        while self._queue:
+            due, entry, key, check, policy, interval, start = heapq.heappop(
+                self._queue
+            )
+            if self._live.get(key) != entry:
+                continue  # discarded or replaced
+            deadline = start + policy.timeout
+            time.sleep(max(0.0, min(due, deadline) - time.monotonic()))
+
+            try:
+                result = check()
+            except Exception as e:
+                del self._live[key]
+                yield key, None, e
+                continue
+            if result is not None:
+                del self._live[key]
+                yield key, result, None
+                continue
+
+            now = time.monotonic()
+            if now >= deadline:
+                del self._live[key]
+                yield key, None, PollTimeout(
+                    f"{key} still pending after {int(now - start)}s"
+                )
+                continue
+            next_due = now + _jittered(interval, policy.jitter)
+            next_interval = min(policy.max_interval, interval * policy.multiplier)
+            heapq.heappush(
+                self._queue,
+                (next_due, entry, key, check, policy, next_interval, start),
+            )
+
+
+def iter_completed(operations):
+    """
+    Poll a fixed set of operations concurrently from one thread.
+
+    Args:
+        operations: dict of key -> (check, PollPolicy)
+
+    Yields:
+        tuple: (key, result, error) as each operation finishes, times out
+               (error is a PollTimeout) or fails (error is the exception)
+    """
+    poller = Poller()
+    for key, (check, policy) in operations.items():
+        poller.add(key, check, policy)
+    yield from poller
+
+
+def poll(check, policy, label="operation"):
+    """
+    Poll a single operation until it finishes.
+
+    Returns:
+        The first non-None value returned by `check`.
+
+    Raises:
+        PollTimeout: if the policy's deadline passes first
+    """
+    for _, result, error in iter_completed({label: (check, policy)}):
+        if error:
+            raise error
+        return result
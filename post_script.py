@@ -1,10 +1,20 @@
-import base64, glob, json, os, requests, sys, time
+import os, sys, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 
+import github_commits
+import media_hosts
+import object_store
+import polling
+import retention
+import state_store
+import transport
+
 # Load environment variables from .env file (if available, for local testing)
 try:
     from dotenv import load_dotenv
@@ -22,184 +32,162 @@ FB_TOKEN = os.getenv("FB_ACCESS_TOKEN")
 IG_ID = os.getenv("IG_PAGE_ID")
 FB_PAGE_ID = os.getenv("FB_PAGE_ID")
 TIKTOK_TOKEN = os.getenv("TIKTOK_ACCESS_TOKEN")
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-GITHUB_REPO = os.getenv("GITHUB_REPO", "moe-a11y/Pips_Projects")  # Default repo
-
-
-def load_video_info():
-    """
-    Load video information (titles and descriptions) from video_info.json file.
-
-    Returns:
-        dict: Dictionary mapping video filenames to their info
-              Format: {"video.mp4": {"title": "...", "description": "..."}}
-    """
-    video_info_file = Path("video_info.json")
-    if not video_info_file.exists():
-        print("⚠️  No video_info.json file found. Creating empty one.")
-        with open(video_info_file, "w") as f:
-            json.dump({}, f, indent=2)
-        return {}
-
-    try:
-        with open(video_info_file, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"❌ Error parsing video_info.json: {e}")
-        return {}
-
 
-def save_video_info(video_info_data):
+# Where Instagram fetches the video from (see media_hosts.py; MEDIA_HOST picks
+# the backend, default "github-contents")
+media_host = media_hosts.get_media_host()
+
+# With BATCH_GITHUB_COMMITS=1 every repository change of the run (hosting
+# deletions, archive moves, video_info.json) is staged and pushed as ONE
+# commit through the Git trees API at the end, instead of a commit per change
+# plus the workflow's own state commit.
+commit_batch = None
+if os.getenv("BATCH_GITHUB_COMMITS") == "1" and os.getenv("GITHUB_TOKEN"):
+    commit_batch = github_commits.CommitBatch(
+        os.getenv("GITHUB_TOKEN"),
+        os.getenv("GITHUB_REPO", "moe-a11y/Pips_Projects"),
+    )
+    if isinstance(media_host, media_hosts.GitHubContentsHost):
+        media_host.batch = commit_batch
+
+# How many platforms to post to at once. Most of a run is spent sleeping in
+# the Instagram/Facebook processing polls, so fanning out makes the run take
+# roughly as long as the slowest platform. Set to 1 for the old one-by-one order.
+POST_MAX_WORKERS = int(os.getenv("POST_MAX_WORKERS", "4"))
+
+# Size of each piece when streaming videos up to YouTube, Facebook and TikTok.
+# Only one chunk is ever held in memory, and a failed chunk is the only thing
+# re-sent (transport.py retries it).
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+TIKTOK_MIN_CHUNK_SIZE = 5 * 1024 * 1024
+TIKTOK_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Processing waits. Instagram usually needs ~20-40 s to fetch and transcode
+# the video, a Facebook Reel ~10-30 s to go live; checks then back off with
+# jitter until the deadline (same overall budgets as the old fixed loops).
+IG_CONTAINER_POLL = polling.PollPolicy(
+    first_delay=15, interval=5, max_interval=30, timeout=300
+)
+FB_REEL_POLL = polling.PollPolicy(
+    first_delay=10, interval=5, max_interval=30, timeout=180
+)
+
+# Drain mode (--drain / POST_DRAIN=1) posts the whole videos/ queue in one run:
+# up to DRAIN_MAX_VIDEOS videos in flight, at most PLATFORM_CONCURRENCY uploads
+# per platform at a time, and at most a daily number of posts per platform
+# (override with DAILY_POST_LIMITS="youtube=6,tiktok=15").
+DRAIN_MAX_VIDEOS = int(os.getenv("DRAIN_MAX_VIDEOS", "3"))
+PLATFORM_CONCURRENCY = int(os.getenv("PLATFORM_CONCURRENCY", "1"))
+DEFAULT_DAILY_POST_LIMITS = {
+    "youtube": 6,  # ~1,600 quota units per upload against a 10,000/day quota
+    "instagram": 25,
+    "facebook": 25,
+    "tiktok": 15,
+}
+
+# A freshly published hosting URL (e.g. raw.githubusercontent behind its CDN)
+# can take a little while to serve the new bytes
+HOSTED_URL_POLL = polling.PollPolicy(
+    first_delay=0, interval=5, max_interval=20, timeout=120
+)
+
+# video path -> (size, sha256) recorded by generate_video.py, so the hosting
+# checks can trust the file without re-hashing it
+_recorded_digests = {}
+
+
+def export_video_info():
     """
-    Save video information back to video_info.json file.
-
-    Args:
-        video_info_data: Dictionary of video info to save
+    Bring video_info.json (the committed copy of the state store) up to date.
     """
-    video_info_file = Path("video_info.json")
-    with open(video_info_file, "w") as f:
-        json.dump(video_info_data, f, indent=2)
-    print(f"✓ Updated video_info.json")
+    state_store.get_store().export_json()
 
 
 def delete_video_info_for_video(video_filename):
     """
-    Delete video info entry for a specific video from video_info.json.
+    Delete a video's entry from the state store.
 
     Args:
         video_filename: Name of the video file to remove info for
     """
-    video_info = load_video_info()
-    if video_filename in video_info:
-        del video_info[video_filename]
-        save_video_info(video_info)
-        print(f"✓ Deleted video info for {video_filename} from video_info.json")
+    if state_store.get_store().delete_entry(video_filename):
+        print(f"✓ Deleted video info for {video_filename}")
     else:
-        print(f"ℹ️  No video info entry found for {video_filename} in video_info.json")
+        print(f"ℹ️  No video info entry found for {video_filename}")
 
 
-def delete_from_github(video_filename):
+class UploadSession(dict):
     """
-    Delete a video file from GitHub repository's instagram_videos folder.
-
-    Args:
-        video_filename: Name of the video file to delete from GitHub
-
-    Returns:
-        bool: True if deleted successfully, False otherwise
+    Per-platform upload progress, persisted in the state store (exported to
+    video_info.json under the video's "uploads" key, next to "posted"), so an
+    interrupted upload can continue the same remote session on the next run
+    instead of starting again from byte zero.
     """
-    if not GITHUB_TOKEN:
-        print("⚠️  GitHub token not configured, skipping GitHub deletion")
-        return False
-
-    github_path = f"instagram_videos/{video_filename}"
-    api_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_path}"
 
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json",
-    }
+    def __init__(self, data=None, on_save=None):
+        super().__init__(data or {})
+        self._on_save = on_save
 
-    # First, get the file's SHA (required for deletion)
-    try:
-        check_response = requests.get(api_url, headers=headers)
-        if check_response.status_code == 404:
-            print(
-                f"ℹ️  Video {video_filename} not found in GitHub repo, may have been already deleted"
-            )
-            return True  # Consider this a success since file doesn't exist
-        elif check_response.status_code != 200:
-            print(
-                f"⚠️  Failed to check if video exists in GitHub: {check_response.text}"
-            )
-            return False
+    def save(self, **fields):
+        """Record progress fields and persist them immediately."""
+        self.update(fields)
+        if self._on_save:
+            self._on_save(self)
 
-        file_sha = check_response.json()["sha"]
+    def reset(self):
+        """Forget a session that can no longer be resumed."""
+        self.clear()
+        if self._on_save:
+            self._on_save(self)
 
-        # Now delete the file
-        delete_data = {
-            "message": f"Delete posted video: {video_filename} [automated]",
-            "sha": file_sha,
-            "branch": "main",
-        }
 
-        delete_response = requests.delete(api_url, headers=headers, json=delete_data)
+def read_file_range(path, offset, length):
+    """Read `length` bytes of a file starting at `offset`."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
 
-        if delete_response.status_code == 200:
-            print(f"✓ Successfully deleted {video_filename} from GitHub repository")
-            return True
-        else:
-            print(f"⚠️  Failed to delete video from GitHub: {delete_response.text}")
-            return False
 
-    except Exception as e:
-        print(f"⚠️  Error deleting video from GitHub: {e}")
-        return False
+def iter_file_chunks(path, chunk_size, offset=0):
+    """
+    Yield (offset, bytes) pairs for a file, one chunk at a time, so only a
+    single chunk is ever held in memory regardless of the file size.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield offset, chunk
+            offset += len(chunk)
 
 
-def upload_to_github_raw(video_path):
+def tiktok_chunk_plan(video_size):
     """
-    Upload video to GitHub repository and return the raw URL.
+    Work out TikTok's chunk_size/total_chunk_count for a file.
 
-    Args:
-        video_path: Local path to the video file
+    TikTok requires chunks between 5 MB and 64 MB, with any remainder merged
+    into the final chunk, and counts chunks as video_size // chunk_size. A
+    file no bigger than one chunk (including anything under 5 MB) goes up as
+    one whole chunk, so chunk_size never exceeds video_size.
 
     Returns:
-        str: Raw GitHub URL to access the video
+        tuple: (chunk_size, total_chunk_count)
     """
-    if not GITHUB_TOKEN:
-        raise Exception("GitHub token not configured")
-
-    # Read video file and encode to base64
-    with open(video_path, "rb") as video_file:
-        video_content = video_file.read()
-
-    # Encode to base64 for GitHub API
-    encoded_content = base64.b64encode(video_content).decode("utf-8")
-
-    # Generate unique filename based on original name
-    video_filename = Path(video_path).name
-    github_path = f"instagram_videos/{video_filename}"
-
-    # GitHub API URL
-    api_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_path}"
-
-    # Prepare commit data
-    commit_data = {
-        "message": f"Upload video for Instagram posting: {video_filename}",
-        "content": encoded_content,
-        "branch": "main",
-    }
-
-    # Add headers with authentication
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-
-    # Check if file already exists (to update instead of create)
-    check_response = requests.get(api_url, headers=headers)
-    if check_response.status_code == 200:
-        # File exists, need to include sha for update
-        commit_data["sha"] = check_response.json()["sha"]
-
-    # Upload to GitHub
-    response = requests.put(api_url, headers=headers, json=commit_data)
-
-    if response.status_code not in [200, 201]:
-        raise Exception(f"GitHub upload failed: {response.text}")
-
-    # Construct raw URL
-    raw_url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/{github_path}"
-
-    print(f"Video uploaded to GitHub: {raw_url}")
-    return raw_url
+    chunk_size = max(
+        TIKTOK_MIN_CHUNK_SIZE, min(UPLOAD_CHUNK_SIZE, TIKTOK_MAX_CHUNK_SIZE)
+    )
+    if video_size <= chunk_size:
+        return video_size, 1
+    return chunk_size, video_size // chunk_size
 
 
-def upload_to_youtube(video_path, title, description):
-    """Upload video to YouTube."""
+def upload_to_youtube(video_path, title, description, session=None):
+    """Upload video to YouTube, resuming a previous run's session if one exists."""
     if not all([YT_CLIENT_ID, YT_CLIENT_SECRET, YT_REFRESH_TOKEN]):
         raise Exception("YouTube credentials not configured")
+    session = session if session is not None else UploadSession()
 
     creds = Credentials.from_authorized_user_info(
         info={
@@ -211,7 +199,9 @@ def upload_to_youtube(video_path, title, description):
     )
 
     youtube = build("youtube", "v3", credentials=creds)
-    media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
+    # Resumable chunks must be a multiple of 256 KB
+    chunksize = max(1, UPLOAD_CHUNK_SIZE // (256 * 1024)) * 256 * 1024
+    media = MediaFileUpload(video_path, chunksize=chunksize, resumable=True)
     request = youtube.videos().insert(
         part="snippet,status",
         body={
@@ -229,23 +219,149 @@ def upload_to_youtube(video_path, title, description):
         },
         media_body=media,
     )
-    response = request.execute()
+
+    response = None
+    if session.get("resumable_uri"):
+        # Ask YouTube how many bytes it already has rather than trusting our
+        # last recorded offset
+        offset, response = youtube_upload_status(
+            creds, session["resumable_uri"], os.path.getsize(video_path)
+        )
+        if offset is None:
+            print("⚠️  Saved YouTube upload session expired, starting over.")
+            session.reset()
+        elif response is None:
+            print(f"Resuming YouTube upload session from byte {offset}...")
+            request.resumable_uri = session["resumable_uri"]
+            request.resumable_progress = offset
+
+    while response is None:
+        try:
+            status, response = request.next_chunk()
+        except HttpError as e:
+            if session.get("resumable_uri") and e.resp.status in (404, 410):
+                # The saved session expired: start over with a fresh one
+                print("⚠️  Saved YouTube upload session expired, starting over.")
+                session.reset()
+                return upload_to_youtube(video_path, title, description, session)
+            raise
+        if status:
+            session.save(
+                resumable_uri=request.resumable_uri,
+                offset=request.resumable_progress,
+            )
+            print(f"  YouTube upload progress: {int(status.progress() * 100)}%")
     print(f"YouTube upload complete: video ID = {response.get('id')}")
 
 
-def upload_to_instagram(video_path, title, description):
+def youtube_upload_status(creds, resumable_uri, video_size):
+    """
+    Query a saved resumable upload session (an empty PUT with
+    "Content-Range: bytes */<size>", as the resumable protocol specifies).
+
+    Returns:
+        tuple: (bytes YouTube has, None) while the upload is incomplete,
+               (video_size, video resource) if it already finished, or
+               (None, None) if the session has expired
+
+    Raises:
+        Exception: on any other response
+    """
+    from google.auth.transport.requests import Request
+
+    if not creds.valid:
+        creds.refresh(Request())
+    res = transport.put(
+        resumable_uri,
+        headers={
+            "Authorization": f"Bearer {creds.token}",
+            "Content-Range": f"bytes */{video_size}",
+        },
+        data=b"",
+    )
+    if res.status_code in (404, 410):
+        return None, None
+    if res.status_code in (200, 201):
+        return video_size, res.json()
+    if res.status_code != 308:
+        raise Exception(
+            f"YouTube upload status check failed: {res.status_code} {res.text[:200]}"
+        )
+    # "Range: bytes=0-<last byte received>", absent if nothing arrived yet
+    received = res.headers.get("Range")
+    return (int(received.rsplit("-", 1)[1]) + 1 if received else 0), None
+
+
+def video_digest(video_path):
+    """
+    The video's (size, sha256): the values recorded when it was generated if
+    the file still has that size, otherwise hashed from disk.
+    """
+    size = os.path.getsize(video_path)
+    recorded = _recorded_digests.get(str(video_path))
+    if recorded and recorded[0] == size:
+        return recorded
+    return size, media_hosts.file_sha256(video_path)
+
+
+def stage_instagram_copy(video_path, session):
+    """
+    Make sure a public copy of the video is being served for Instagram to
+    fetch, and return its URL.
+
+    A URL recorded in the session (pre-staged at generation time, or from an
+    earlier attempt) is reused if it serves the right size and checksum.
+    Otherwise the video is published now. Either way the URL is probed until
+    it serves the exact bytes, so Graph never fetches a stale or missing copy.
+    """
+    video_size, video_sha256 = video_digest(video_path)
+
+    video_url = session.get("hosted_url")
+    if video_url and session.get("hosted_sha256") == video_sha256:
+        if media_hosts.is_served(video_url, video_size, video_sha256):
+            print(f"✓ Using pre-staged hosting copy: {video_url}")
+            return video_url
+        print("ℹ️  Pre-staged hosting copy isn't serving these bytes, re-publishing.")
+
+    video_url = media_host.publish(video_path)
+    session.save(
+        hosted_url=video_url, hosted_size=video_size, hosted_sha256=video_sha256
+    )
+
+    def check_served():
+        if media_hosts.is_served(video_url, video_size, video_sha256):
+            return True
+        return None
+
+    try:
+        polling.poll(check_served, HOSTED_URL_POLL, "hosted video URL")
+    except polling.PollTimeout:
+        print(
+            f"⚠️  {video_url} still isn't serving the expected bytes; "
+            "continuing and letting Instagram retry the fetch."
+        )
+    return video_url
+
+
+def upload_to_instagram(video_path, title, description, session=None):
     """Upload video to Instagram as a Reel."""
     if not all([FB_TOKEN, IG_ID]):
         raise Exception("Instagram credentials not configured")
 
-    if not GITHUB_TOKEN:
-        raise Exception("GitHub token required for Instagram uploads (to host video)")
+    if not media_host.is_configured():
+        raise Exception(
+            f"Media host '{media_host.name}' not configured "
+            "(Instagram needs a public URL to fetch the video from)"
+        )
 
     # Combine title and description for Instagram caption
     caption = f"{title}\n{description}"
 
-    # 1. Upload video to GitHub to get a publicly accessible URL
-    video_url = upload_to_github_raw(video_path)
+    # 1. Get a public URL for the video: reuse the hosting copy generate_video.py
+    #    pre-staged (or a previous run published) once it's confirmed to serve
+    #    these exact bytes; otherwise publish it through the media host now
+    session = session if session is not None else UploadSession()
+    video_url = stage_instagram_copy(video_path, session)
 
     # 2. Create IG media container
     create_url = f"https://graph.facebook.com/v17.0/{IG_ID}/media"
@@ -255,7 +371,7 @@ def upload_to_instagram(video_path, title, description):
         "caption": caption,
         "access_token": FB_TOKEN,
     }
-    res = requests.post(create_url, params=params)
+    res = transport.post(create_url, params=params)
     res_data = res.json()
     if "id" not in res_data:
         raise Exception(f"IG upload container creation failed: {res_data}")
@@ -263,36 +379,35 @@ def upload_to_instagram(video_path, title, description):
     print(f"IG container ID: {container_id}. Waiting for processing...")
 
     # 3. Poll for processing status (Instagram needs time to download the video)
-    max_retries = 30
-    for attempt in range(max_retries):
-        time.sleep(10)  # Wait 10 seconds between checks
-        status_url = f"https://graph.facebook.com/v17.0/{container_id}"
-        status_res = requests.get(
-            status_url,
+    def check_container():
+        status_res = transport.get(
+            f"https://graph.facebook.com/v17.0/{container_id}",
             params={"fields": "status_code,status", "access_token": FB_TOKEN},
         )
         status_data = status_res.json()
 
         status_code = status_data.get("status_code")
         status_msg = status_data.get("status", "No status message")
-        print(
-            f"IG processing status (attempt {attempt + 1}/{max_retries}): {status_code} - {status_msg}"
-        )
+        print(f"IG processing status: {status_code} - {status_msg}")
 
         if status_code == "FINISHED":
-            break
+            return status_data
         elif status_code == "ERROR":
             # Get more detailed error information
             error_msg = status_data.get("status", "Unknown error")
             raise Exception(
                 f"IG video processing failed. Status: {status_code}, Message: {error_msg}, Full response: {status_data}"
             )
-    else:
+        return None
+
+    try:
+        polling.poll(check_container, IG_CONTAINER_POLL, "IG container")
+    except polling.PollTimeout:
         raise Exception("IG video processing timeout - took too long")
 
     # 4. Publish the media container
     publish_url = f"https://graph.facebook.com/v17.0/{IG_ID}/media_publish"
-    res2 = requests.post(
+    res2 = transport.post(
         publish_url, params={"creation_id": container_id, "access_token": FB_TOKEN}
     )
     res2_data = res2.json()
@@ -302,79 +417,145 @@ def upload_to_instagram(video_path, title, description):
         raise Exception(f"IG publish failed: {res2_data}")
 
 
-def upload_to_facebook(video_path, title, description):
+def facebook_uploaded_bytes(video_id, saved_offset):
+    """
+    Ask Facebook how many bytes of a Reel upload session it already holds,
+    falling back to the offset we last recorded if it doesn't say.
+
+    Returns:
+        int: the offset to resume from, or None if the lookup failed (the
+             session has most likely expired)
+    """
+    try:
+        res = transport.get(
+            f"https://graph.facebook.com/v18.0/{video_id}",
+            params={"fields": "status", "access_token": FB_TOKEN},
+        )
+        data = res.json()
+    except Exception as e:
+        print(f"⚠️  Could not query FB upload progress ({e}).")
+        return None
+    if res.status_code != 200 or "error" in data:
+        print(f"⚠️  Could not query FB upload progress: {data}")
+        return None
+    uploading = data.get("status", {}).get("uploading_phase", {})
+    return int(uploading.get("bytes_transferred", saved_offset))
+
+
+def upload_to_facebook(video_path, title, description, session=None):
     """Upload video to Facebook page as a Reel."""
     if not all([FB_TOKEN, FB_PAGE_ID]):
         raise Exception("Facebook credentials not configured")
+    session = session if session is not None else UploadSession()
 
     # Combine title and description for the Reel caption
     caption = f"{title}\n{description}"
 
     # 1. Create Facebook Reel container using the video_reels endpoint
     # (unlike Instagram, this API accepts a direct file upload — no public
-    # hosting URL needed)
+    # hosting URL needed). A session saved by an interrupted run is reused so
+    # we neither re-send confirmed bytes nor leave an orphaned draft behind.
     create_url = f"https://graph.facebook.com/v18.0/{FB_PAGE_ID}/video_reels"
-    params = {
-        "upload_phase": "start",
-        "access_token": FB_TOKEN,
-    }
-
-    # Start the upload session
-    start_res = requests.post(create_url, params=params)
-    start_data = start_res.json()
-
-    if "video_id" not in start_data:
-        raise Exception(f"FB Reel upload session start failed: {start_data}")
-
-    video_id = start_data["video_id"]
-    upload_url = start_data.get("upload_url")
-    print(f"FB Reel upload session started. Video ID: {video_id}")
+    video_size = os.path.getsize(video_path)
 
-    # 2. Upload the video file
-    with open(video_path, "rb") as video_file:
-        video_data = video_file.read()
+    resuming = session.get("video_id") and session.get("file_size") == video_size
+    if resuming:
+        video_id = session["video_id"]
+        upload_url = session["upload_url"]
+        if session.get("finished"):
+            offset = video_size
+        else:
+            offset = facebook_uploaded_bytes(video_id, session.get("offset", 0))
+            if offset is None:
+                # The saved session has most likely expired: start a new one
+                print(
+                    "⚠️  Saved FB Reel upload session is no longer valid, "
+                    "starting over."
+                )
+                session.reset()
+                return upload_to_facebook(video_path, title, description, session)
+        print(f"Resuming FB Reel upload session {video_id} from byte {offset}.")
+    else:
+        params = {
+            "upload_phase": "start",
+            "access_token": FB_TOKEN,
+        }
 
-    # Upload to the provided upload URL
-    upload_headers = {
-        "Authorization": f"OAuth {FB_TOKEN}",
-        "offset": "0",
-        "file_size": str(len(video_data)),
-    }
+        # Start the upload session
+        start_res = transport.post(create_url, params=params)
+        start_data = start_res.json()
 
-    upload_res = requests.post(
-        upload_url,
-        headers=upload_headers,
-        data=video_data,
-    )
-    upload_result = upload_res.json()
+        if "video_id" not in start_data:
+            raise Exception(f"FB Reel upload session start failed: {start_data}")
 
-    if not upload_result.get("success"):
-        raise Exception(f"FB Reel video upload failed: {upload_result}")
+        video_id = start_data["video_id"]
+        upload_url = start_data.get("upload_url")
+        offset = 0
+        session.reset()
+        session.save(
+            video_id=video_id, upload_url=upload_url, file_size=video_size, offset=0
+        )
+        print(f"FB Reel upload session started. Video ID: {video_id}")
+
+    # 2. Stream the video file up in fixed-size chunks. The offset header
+    #    tells Facebook where each chunk belongs, so a failed chunk is simply
+    #    re-sent at the same offset (which is why it's safe to retry).
+    for chunk_offset, chunk in iter_file_chunks(
+        video_path, UPLOAD_CHUNK_SIZE, offset
+    ):
+        upload_res = transport.post(
+            upload_url,
+            headers={
+                "Authorization": f"OAuth {FB_TOKEN}",
+                "offset": str(chunk_offset),
+                "file_size": str(video_size),
+            },
+            data=chunk,
+            idempotent=True,
+            timeout=transport.UPLOAD_TIMEOUT,
+        )
+        try:
+            upload_result = upload_res.json()
+        except ValueError:
+            upload_result = {"status": upload_res.status_code}
+        if not upload_result.get("success"):
+            if not resuming:
+                raise Exception(f"FB Reel video upload failed: {upload_result}")
+            # The saved session has most likely expired: start a new one
+            print(
+                "⚠️  Saved FB Reel upload session is no longer valid, starting over."
+            )
+            session.reset()
+            return upload_to_facebook(video_path, title, description, session)
+        resuming = False
+        session.save(offset=chunk_offset + len(chunk))
+        print(f"  FB Reel upload progress: {session['offset']}/{video_size} bytes")
 
     print(f"FB Reel video uploaded successfully")
 
     # 3. Finish the upload and publish the Reel.
     # video_state=PUBLISHED is required — without it the reel is only
     # uploaded as an invisible draft, even though the API reports success.
-    finish_params = {
-        "upload_phase": "finish",
-        "video_id": video_id,
-        "video_state": "PUBLISHED",
-        "title": title,
-        "description": caption,
-        "access_token": FB_TOKEN,
-    }
+    if not session.get("finished"):
+        finish_params = {
+            "upload_phase": "finish",
+            "video_id": video_id,
+            "video_state": "PUBLISHED",
+            "title": title,
+            "description": caption,
+            "access_token": FB_TOKEN,
+        }
 
-    finish_res = requests.post(create_url, params=finish_params)
-    finish_data = finish_res.json()
+        finish_res = transport.post(create_url, params=finish_params)
+        finish_data = finish_res.json()
 
-    if not finish_data.get("success"):
-        raise Exception(f"FB Reel publish failed: {finish_data}")
+        if not finish_data.get("success"):
+            raise Exception(f"FB Reel publish failed: {finish_data}")
+        session.save(finished=True)
 
     # 4. Verify the reel actually goes live (processing can take a minute)
-    for attempt in range(18):
-        time.sleep(10)
-        status_res = requests.get(
+    def check_reel():
+        status_res = transport.get(
             f"https://graph.facebook.com/v18.0/{video_id}",
             params={"fields": "status", "access_token": FB_TOKEN},
         )
@@ -382,67 +563,111 @@ def upload_to_facebook(video_path, title, description):
         video_status = status.get("video_status")
         publish_status = status.get("publishing_phase", {}).get("status")
         print(
-            f"FB Reel processing status (attempt {attempt + 1}/18): "
+            f"FB Reel processing status: "
             f"video_status={video_status}, publishing={publish_status}"
         )
         if video_status == "error":
             raise Exception(f"FB Reel processing failed: {status}")
         if video_status == "ready" or publish_status == "complete":
-            print(f"Facebook Reel posted successfully (Video ID: {video_id}).")
-            return
-    print(
-        f"⚠️  FB Reel still processing after 3 minutes (Video ID: {video_id}); "
-        "treating as posted — check the page if it doesn't appear."
-    )
+            return status
+        return None
+
+    try:
+        polling.poll(check_reel, FB_REEL_POLL, "FB Reel")
+        print(f"Facebook Reel posted successfully (Video ID: {video_id}).")
+    except polling.PollTimeout:
+        print(
+            f"⚠️  FB Reel still processing after {int(FB_REEL_POLL.timeout)}s "
+            f"(Video ID: {video_id}); treating as posted — check the page if it "
+            "doesn't appear."
+        )
 
 
-def upload_to_tiktok(video_path, description):
+def upload_to_tiktok(video_path, description, session=None):
     """Upload video to TikTok using the v2 Content Posting API (direct post)."""
     if not TIKTOK_TOKEN:
         raise Exception("TikTok credentials not configured")
+    session = session if session is not None else UploadSession()
 
     video_size = os.path.getsize(video_path)
-
-    # 1. Initialize the direct-post upload session
-    init_res = requests.post(
-        "https://open.tiktokapis.com/v2/post/publish/video/init/",
-        headers={
-            "Authorization": f"Bearer {TIKTOK_TOKEN}",
-            "Content-Type": "application/json; charset=UTF-8",
-        },
-        json={
-            "post_info": {
-                "title": description[:2200],
-                "privacy_level": "PUBLIC_TO_EVERYONE",
+    chunk_size, total_chunk_count = tiktok_chunk_plan(video_size)
+
+    # TikTok upload URLs stay valid for about an hour, so a session saved by a
+    # recent interrupted run can pick up at the next unconfirmed chunk
+    resuming = (
+        session.get("upload_url")
+        and session.get("video_size") == video_size
+        and session.get("chunk_size") == chunk_size
+    )
+    if resuming:
+        upload_url = session["upload_url"]
+        publish_id = session.get("publish_id")
+        print(
+            f"Resuming TikTok upload (publish ID: {publish_id}) at chunk "
+            f"{session.get('next_chunk', 0) + 1}/{total_chunk_count}."
+        )
+    else:
+        # 1. Initialize the direct-post upload session
+        init_res = transport.post(
+            "https://open.tiktokapis.com/v2/post/publish/video/init/",
+            headers={
+                "Authorization": f"Bearer {TIKTOK_TOKEN}",
+                "Content-Type": "application/json; charset=UTF-8",
             },
-            "source_info": {
-                "source": "FILE_UPLOAD",
-                "video_size": video_size,
-                "chunk_size": video_size,
-                "total_chunk_count": 1,
+            json={
+                "post_info": {
+                    "title": description[:2200],
+                    "privacy_level": "PUBLIC_TO_EVERYONE",
+                },
+                "source_info": {
+                    "source": "FILE_UPLOAD",
+                    "video_size": video_size,
+                    "chunk_size": chunk_size,
+                    "total_chunk_count": total_chunk_count,
+                },
             },
-        },
-    )
-    init_data = init_res.json()
-    upload_url = init_data.get("data", {}).get("upload_url")
-    if init_res.status_code != 200 or not upload_url:
-        raise Exception(f"TikTok upload init failed: {init_res.text}")
-
-    # 2. Upload the video file in a single chunk
-    with open(video_path, "rb") as f:
-        video_bytes = f.read()
-    upload_res = requests.put(
-        upload_url,
-        headers={
-            "Content-Type": "video/mp4",
-            "Content-Range": f"bytes 0-{video_size - 1}/{video_size}",
-        },
-        data=video_bytes,
-    )
-    if upload_res.status_code not in (200, 201):
-        raise Exception(f"TikTok video upload failed: {upload_res.text}")
+        )
+        init_data = init_res.json()
+        upload_url = init_data.get("data", {}).get("upload_url")
+        if init_res.status_code != 200 or not upload_url:
+            raise Exception(f"TikTok upload init failed: {init_res.text}")
+        publish_id = init_data.get("data", {}).get("publish_id")
+        session.reset()
+        session.save(
+            upload_url=upload_url,
+            publish_id=publish_id,
+            video_size=video_size,
+            chunk_size=chunk_size,
+            next_chunk=0,
+        )
+
+    # 2. Stream the video file up chunk by chunk. TikTok folds any remainder
+    #    into the final chunk, so it can be up to 2x chunk_size long.
+    for index in range(session.get("next_chunk", 0), total_chunk_count):
+        start = index * chunk_size
+        end = video_size if index == total_chunk_count - 1 else start + chunk_size
+        chunk = read_file_range(video_path, start, end - start)
+
+        upload_res = transport.put(
+            upload_url,
+            headers={
+                "Content-Type": "video/mp4",
+                "Content-Range": f"bytes {start}-{end - 1}/{video_size}",
+            },
+            data=chunk,
+            timeout=transport.UPLOAD_TIMEOUT,
+        )
+        if upload_res.status_code not in (200, 201, 206):
+            if not resuming:
+                raise Exception(f"TikTok video upload failed: {upload_res.text}")
+            # The saved upload URL has most likely expired: start a new post
+            print("⚠️  Saved TikTok upload session is no longer valid, starting over.")
+            session.reset()
+            return upload_to_tiktok(video_path, description, session)
+        resuming = False
+        session.save(next_chunk=index + 1)
+        print(f"  TikTok upload progress: chunk {index + 1}/{total_chunk_count}")
 
-    publish_id = init_data.get("data", {}).get("publish_id")
     print(f"TikTok upload successful (publish ID: {publish_id}).")
 
 
@@ -451,44 +676,184 @@ def get_configured_platforms():
     Determine which platforms have credentials configured.
 
     Returns:
-        dict: platform name -> upload function (called as fn(video_path, title, description))
+        dict: platform name -> upload function
+              (called as fn(video_path, title, description, session))
     """
     platforms = {}
     if all([YT_CLIENT_ID, YT_CLIENT_SECRET, YT_REFRESH_TOKEN]):
         platforms["youtube"] = upload_to_youtube
-    if all([FB_TOKEN, IG_ID, GITHUB_TOKEN]):
+    if all([FB_TOKEN, IG_ID]) and media_host.is_configured():
         platforms["instagram"] = upload_to_instagram
     if all([FB_TOKEN, FB_PAGE_ID]):
         platforms["facebook"] = upload_to_facebook
     if TIKTOK_TOKEN:
-        platforms["tiktok"] = lambda path, title, description: upload_to_tiktok(
-            path, f"{title}\n{description}"
+        platforms["tiktok"] = lambda path, title, description, session: (
+            upload_to_tiktok(path, f"{title}\n{description}", session)
         )
     return platforms
 
 
-VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".avi", ".webm", ".mkv")
+class PostingDeferred(Exception):
+    """A platform hit its daily post limit; the video waits for the next run."""
 
 
-def main():
-    # 1. Find the oldest video file in 'videos' folder (ignore companion
-    #    .txt files and anything else that isn't a video)
-    video_files = sorted(
-        f for f in glob.glob("videos/*.*") if f.lower().endswith(VIDEO_EXTENSIONS)
+def parse_daily_limits(spec):
+    """Parse DAILY_POST_LIMITS ("youtube=6,tiktok=15") over the defaults."""
+    limits = dict(DEFAULT_DAILY_POST_LIMITS)
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+def posts_today():
+    """
+    Count today's (UTC) posts per platform from persisted state: queued
+    videos in the state store, and already-archived ones in the archive
+    manifest. Earlier runs the same day (a manual dispatch, a rerun) count.
+
+    Returns:
+        dict: platform -> number of videos posted to it today
+    """
+    today = state_store.utc_today()
+    counts = state_store.get_store().posted_counts(today)
+    for record in retention.load_manifest().values():
+        for platform, day in record.get("posted_on", {}).items():
+            if day == today:
+                counts[platform] = counts.get(platform, 0) + 1
+    return counts
+
+
+def limit_platforms(platforms):
+    """
+    Wrap each platform's upload function with drain-mode limits: at most
+    PLATFORM_CONCURRENCY uploads to one platform at a time (across videos),
+    and at most its daily limit of posts per UTC day, counting posts already
+    made today by earlier runs. Over the limit, the upload raises
+    PostingDeferred instead of posting.
+    """
+    limits = parse_daily_limits(os.getenv("DAILY_POST_LIMITS"))
+    posted_today = posts_today()
+    counts = {name: posted_today.get(name, 0) for name in platforms}
+    counts_lock = threading.Lock()
+    limited = {}
+
+    for name, upload_fn in platforms.items():
+        slots = threading.Semaphore(PLATFORM_CONCURRENCY)
+
+        def limited_fn(
+            path,
+            title,
+            description,
+            session,
+            name=name,
+            upload_fn=upload_fn,
+            slots=slots,
+        ):
+            with slots:
+                with counts_lock:
+                    if counts[name] >= limits.get(name, float("inf")):
+                        raise PostingDeferred(
+                            f"{name} daily limit of {limits[name]} posts reached"
+                        )
+                    counts[name] += 1
+                try:
+                    return upload_fn(path, title, description, session)
+                except Exception:
+                    # A failed upload didn't use up one of the day's posts
+                    with counts_lock:
+                        counts[name] -= 1
+                    raise
+
+        limited[name] = limited_fn
+    return limited
+
+
+def post_to_platforms(platforms, video_path, title, description, video_filename):
+    """
+    Post one video to every pending platform concurrently.
+
+    Each platform runs on a bounded worker pool (POST_MAX_WORKERS). A success
+    is recorded in the state store straight away (and exported to
+    video_info.json), so a crash mid-run never loses a platform that already
+    went out. In-progress upload sessions are stored until the platform
+    succeeds, so the next run can resume them.
+
+    Returns:
+        tuple: (failed platform names, platform names deferred by a daily limit)
+    """
+    store = state_store.get_store()
+    entry = store.entry(video_filename) or {}
+    posted = entry.get("posted", {})
+    uploads = entry.get("uploads", {})
+    pending = {}
+    for name, upload_fn in platforms.items():
+        if posted.get(name):
+            print(f"↷ Skipping {name}: already posted on a previous run.")
+        else:
+            pending[name] = upload_fn
+    if not pending:
+        return [], []
+
+    def post_one(name, upload_fn):
+        session = UploadSession(
+            uploads.get(name),
+            on_save=lambda s: store.save_upload(video_filename, name, s),
+        )
+        upload_fn(video_path, title, description, session)
+        # One-row transaction; video_info.json is exported once per run
+        store.mark_posted(video_filename, name)
+
+    failed_platforms = []
+    deferred_platforms = []
+    workers = max(1, min(POST_MAX_WORKERS, len(pending)))
+    print(
+        f"Posting {video_filename} to {', '.join(pending)} ({workers} at a time)..."
     )
-    if not video_files:
-        print("No video file found in the videos/ folder. Exiting without posting.")
-        return
-    video_path = video_files[0]
-    video_filename = Path(video_path).name
-    print(f"Found video file: {video_path}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(post_one, name, upload_fn): name
+            for name, upload_fn in pending.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                print(f"✓ {name} upload of {video_filename} succeeded.")
+            except PostingDeferred as e:
+                deferred_platforms.append(name)
+                print(f"↷ {name} deferred for {video_filename}: {e}")
+            except Exception as e:
+                failed_platforms.append(name)
+                print(f"✗ {name} upload of {video_filename} failed: {e}")
+    return failed_platforms, deferred_platforms
+
+
+def find_queued_videos():
+    """
+    List videos waiting in 'videos', oldest first (filenames carry the date):
+    those with a pointer to the object store, and any older local video
+    files. Companion .txt files and anything else that isn't a video are
+    ignored.
+    """
+    return [str(path) for path in object_store.list_videos("videos")]
+
+
+def resolve_video_info(video_path):
+    """
+    Work out a video's title and description from the state store, falling
+    back to a legacy companion .txt file and then to defaults. Creates the
+    video's entry if it has none, so per-platform posted state can be tracked.
 
-    # 2. Load video info (title & description) from video_info.json
-    video_info_data = load_video_info()
+    Returns:
+        tuple: (title, description)
+    """
+    video_filename = Path(video_path).name
+    store = state_store.get_store()
 
     # Check if this video has an info entry
-    if video_filename in video_info_data:
-        video_info = video_info_data[video_filename]
+    video_info = store.entry(video_filename)
+    if video_info is not None:
         # Get title from JSON, use default if not present
         title = video_info.get("title", "Pip's New Adventure")
         description = video_info.get(
@@ -525,56 +890,46 @@ def main():
             print(f"⚠️  No .txt file found either, using default description")
 
         # Create an entry so per-platform posted state can be tracked across runs
-        video_info_data[video_filename] = {"title": title, "description": description}
-
-    print(f"Using title: {title}")
-    print(f"Description/Caption: {description}")
-
-    # 3. Post to each configured platform, skipping ones already posted on a
-    #    previous (partially failed) run. State lives in video_info.json under
-    #    the "posted" key so a retry never double-posts.
-    platforms = get_configured_platforms()
-    if not platforms:
-        print("✗ No platforms configured. Check your credentials.")
-        sys.exit(1)
+        store.put_entry(video_filename, {"title": title, "description": description})
 
-    posted = video_info_data[video_filename].setdefault("posted", {})
-    failed_platforms = []
+    return title, description
 
-    for name, upload_fn in platforms.items():
-        if posted.get(name):
-            print(f"↷ Skipping {name}: already posted on a previous run.")
-            continue
-        try:
-            upload_fn(video_path, title, description)
-            posted[name] = True
-            save_video_info(video_info_data)  # persist immediately after each success
-            print(f"✓ {name} upload succeeded.")
-        except Exception as e:
-            failed_platforms.append(name)
-            print(f"✗ {name} upload failed: {e}")
-
-    # 4. Only clean up once EVERY configured platform has posted. Otherwise keep
-    #    the video and its posted-state so the next run retries just the failures.
-    if failed_platforms:
-        save_video_info(video_info_data)
-        print(
-            f"✗ Failed platforms: {', '.join(failed_platforms)}. "
-            "Video retained for retry; already-posted platforms will be skipped next run."
-        )
-        sys.exit(1)
 
-    print("✓ All configured platforms posted successfully. Cleaning up...")
+def archive_posted_video(video_path):
+    """Archive a fully-posted video and clean up everything it left behind."""
+    video_filename = Path(video_path).name
     try:
-        # Move the posted video to posted_archive/ as a ~1-month safety copy.
-        # A monthly workflow prunes old archives and rewrites git history so
-        # purged videos are permanently deleted from the repo.
-        archive_path = Path("posted_archive") / Path(video_path).name
+        # Move the posted video's pointer to posted_archive/ as a ~1-month
+        # safety copy (the bytes stay in the object store). A monthly
+        # workflow prunes old archives with retention.py, using the manifest
+        # entry recorded here, and deletes their stored objects.
+        archive_path = Path("posted_archive") / video_filename
         archive_path.parent.mkdir(exist_ok=True)
-        Path(video_path).rename(archive_path)
-        print(f"✓ Archived posted video: {video_path} -> {archive_path}")
+        entry = state_store.get_store().entry(video_filename) or {}
+        if object_store.read_pointer(video_path) is None:
+            # Queued before the object store: store it now, so the archive
+            # holds a pointer rather than the video itself
+            object_store.upload(
+                video_path,
+                entry.get("sha256") or media_hosts.file_sha256(video_path),
+                Path(video_path).stat().st_size,
+            )
+        pointer = object_store.pointer_path(video_path)
+        archive_pointer = object_store.pointer_path(archive_path)
+        pointer.rename(archive_pointer)
+        if Path(video_path).exists():
+            Path(video_path).rename(archive_path)  # local copy, not committed
+        print(f"✓ Archived posted video: {video_path} -> {archive_pointer}")
+        retention.record_archived(
+            archive_path, dict(entry, **object_store.read_pointer(archive_path))
+        )
+        if commit_batch is not None:
+            commit_batch.delete(pointer.as_posix())
+            # A video committed before the object store existed
+            commit_batch.delete(Path(video_path).as_posix())
+            commit_batch.put_file(archive_pointer.as_posix(), archive_pointer)
 
-        # Delete the video info entry from video_info.json
+        # Delete the video's entry from the state store
         delete_video_info_for_video(video_filename)
 
         # Also delete the description .txt file if it exists (legacy support)
@@ -582,6 +937,8 @@ def main():
         if desc_file.exists():
             os.remove(desc_file)
             print(f"✓ Successfully deleted description file: {desc_file}")
+            if commit_batch is not None:
+                commit_batch.delete(desc_file.as_posix())
 
         # Delete the video from local instagram_videos folder if it exists
         instagram_video_path = Path(f"instagram_videos/{video_filename}")
@@ -590,14 +947,175 @@ def main():
             print(
                 f"✓ Successfully deleted local Instagram video file: {instagram_video_path}"
             )
+            if commit_batch is not None:
+                commit_batch.delete(instagram_video_path.as_posix())
 
-        # Delete the video from GitHub repository's instagram_videos folder
-        # This is important for GitHub Actions where the video is uploaded to GitHub
-        delete_from_github(video_filename)
+        # Take down the public hosting copy used for Instagram ingestion
+        media_host.remove(video_filename)
 
     except Exception as e:
         print(f"✗ Post-upload archive/cleanup failed: {e}")
 
 
+def post_video(video_path, platforms):
+    """
+    Post one queued video everywhere it's still pending and archive it once
+    every configured platform has it.
+
+    Returns:
+        tuple: (failed platform names, deferred platform names)
+    """
+    video_filename = Path(video_path).name
+    print(f"Found video file: {video_path}")
+    try:
+        object_store.fetch(video_path)
+    except Exception as e:
+        print(f"✗ Could not fetch {video_filename} from the object store: {e}")
+        return ["all"], []
+    title, description = resolve_video_info(video_path)
+    entry = state_store.get_store().entry(video_filename) or {}
+    if entry.get("sha256") and entry.get("size"):
+        _recorded_digests[str(video_path)] = (entry["size"], entry["sha256"])
+    print(f"Using title: {title}")
+    print(f"Description/Caption: {description}")
+
+    # Post to every configured platform at once, skipping ones already posted
+    # on a previous (partially failed) run. State lives in the state store
+    # (video_info.json's "posted" key) so a retry never double-posts.
+    failed_platforms, deferred_platforms = post_to_platforms(
+        platforms, video_path, title, description, video_filename
+    )
+
+    # Only clean up once EVERY configured platform has posted. Otherwise keep
+    # the video and its posted-state so the next run retries just the rest.
+    if failed_platforms or deferred_platforms:
+        export_video_info()
+        if failed_platforms:
+            print(
+                f"✗ Failed platforms for {video_filename}: {', '.join(failed_platforms)}. "
+                "Video retained for retry; already-posted platforms will be skipped next run."
+            )
+        return failed_platforms, deferred_platforms
+
+    print(
+        f"✓ All configured platforms posted {video_filename} successfully. Cleaning up..."
+    )
+    archive_posted_video(video_path)
+    return [], []
+
+
+def drain_queue(video_files, platforms):
+    """
+    Post every queued video in one run, oldest first.
+
+    Videos are pipelined DRAIN_MAX_VIDEOS at a time while each platform takes
+    at most PLATFORM_CONCURRENCY uploads at once (videos are started oldest
+    first, so posts go out in date order as far as the slots allow) and stops
+    at its daily limit. Every video keeps its own posted state, so one failing video
+    never holds up the rest.
+
+    Returns:
+        list: filenames of videos that had a failed platform
+    """
+    platforms = limit_platforms(platforms)
+    failed_videos = []
+    deferred_videos = []
+    print(f"Draining {len(video_files)} queued video(s)...")
+    with ThreadPoolExecutor(max_workers=max(1, DRAIN_MAX_VIDEOS)) as pool:
+        futures = {
+            pool.submit(post_video, path, platforms): Path(path).name
+            for path in video_files
+        }
+        for future in as_completed(futures):
+            video_filename = futures[future]
+            try:
+                failed, deferred = future.result()
+            except Exception as e:
+                failed, deferred = ["all"], []
+                print(f"✗ Posting {video_filename} failed: {e}")
+            if failed:
+                failed_videos.append(video_filename)
+            elif deferred:
+                deferred_videos.append(video_filename)
+
+    posted_count = len(video_files) - len(failed_videos) - len(deferred_videos)
+    print(
+        f"Drain finished: {posted_count} video(s) fully posted, "
+        f"{len(deferred_videos)} waiting on daily limits, "
+        f"{len(failed_videos)} with failures."
+    )
+    return sorted(failed_videos)
+
+
+def flush_commit_batch():
+    """
+    Push the run's staged repository changes plus the final video_info.json
+    and archive manifest as one commit. On success, tell the workflow (via GITHUB_OUTPUT) that the
+    state is already committed so its own commit step can be skipped.
+    """
+    if commit_batch is None:
+        return
+    try:
+        export_video_info()
+        commit_batch.put_file("video_info.json", Path("video_info.json"))
+        if retention.MANIFEST_FILE.exists():
+            commit_batch.put_file(
+                retention.MANIFEST_FILE.as_posix(), retention.MANIFEST_FILE
+            )
+        commit_batch.commit("Update posting state / archive posted videos [automated]")
+    except Exception as e:
+        print(f"⚠️  Batched commit failed ({e}); leaving changes for the workflow.")
+        # The workflow commits local files, but hosting copies only exist
+        # remotely: take those down directly instead
+        media_host.batch = None
+        for path in commit_batch.staged_deletes:
+            if path.startswith("instagram_videos/"):
+                media_host.remove(Path(path).name)
+        return
+    github_output = os.getenv("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a") as f:
+            f.write("state_committed=true\n")
+
+
+def main():
+    # 1. Find the queued videos (oldest first). Normally only the oldest is
+    #    posted; drain mode (--drain or POST_DRAIN=1) posts the whole queue.
+    video_files = find_queued_videos()
+    if not video_files:
+        print("No video file found in the videos/ folder. Exiting without posting.")
+        return
+    drain = "--drain" in sys.argv[1:] or os.getenv("POST_DRAIN") == "1"
+
+    # 2. Open the state store (titles, captions, posted platforms), importing
+    #    video_info.json if it changed since the store last saw it
+    try:
+        state_store.get_store()
+    except state_store.StateCorrupt as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    platforms = get_configured_platforms()
+    if not platforms:
+        print("✗ No platforms configured. Check your credentials.")
+        sys.exit(1)
+
+    # 3. Post, exiting nonzero if anything failed so the run alerts. The
+    #    run's state is committed either way.
+    try:
+        if drain:
+            failed = drain_queue(video_files, platforms)
+        else:
+            failed, _ = post_video(video_files[0], platforms)
+    finally:
+        export_video_info()
+    flush_commit_batch()
+    if failed:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        transport.print_latency_summary()
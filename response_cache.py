@@ -0,0 +1,159 @@
+"""
+Content-addressed record/replay cache for the paid model calls.
+
+The Gemini script call and the Veo render are keyed by a hash of everything
+that determines their output (model, prompt, config, reference-image digests),
+so a same-day rerun with unchanged inputs is served from disk instead of paying
+for — and waiting on — the same generation again.
+
+Modes (RESPONSE_CACHE):
+  record  serve hits, call the model on a miss and store the result (default)
+  replay  serve hits only; a miss raises CacheMiss, so the pipeline can be
+          exercised deterministically without network access
+  off     bypass the cache entirely
+
+Entries live under .cache/responses/. Once the total passes
+RESPONSE_CACHE_MAX_MB the least recently used entries are evicted (a hit
+refreshes an entry's mtime, which serves as the LRU clock).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+# Defaults for RESPONSE_CACHE_DIR, RESPONSE_CACHE and RESPONSE_CACHE_MAX_MB
+CACHE_DIR = Path(".cache/responses")
+MODE = "record"
+MAX_MB = 500
+MODES = ("record", "replay", "off")
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def make_key(kind, **parts):
+    """Stable hash of a call's kind and every input that shapes its output."""
+    payload = json.dumps({"kind": kind, **parts}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory=None, mode=None, max_bytes=None):
+        """Arguments not passed in are read from the environment."""
+        directory = directory or os.getenv("RESPONSE_CACHE_DIR") or CACHE_DIR
+        if mode is None:
+            mode = os.getenv("RESPONSE_CACHE", MODE).strip().lower()
+        if max_bytes is None:
+            max_mb = float(os.getenv("RESPONSE_CACHE_MAX_MB", MAX_MB))
+            max_bytes = int(max_mb * 1024 * 1024)
+        if mode not in MODES:
+            raise ValueError(f"RESPONSE_CACHE must be one of {MODES}, got {mode!r}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key, label="response"):
+        """
+        The recorded bytes for `key`, or None on a miss.
+
+        Raises:
+            CacheMiss: on a miss in replay mode
+        """
+        if self.mode == "off":
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise CacheMiss(f"No recorded {label} for key {key[:12]}")
+            return None
+        os.utime(path)
+        print(f"↺ Using cached {label} ({key[:12]})")
+        return data
+
+    def put(self, key, data):
+        """Record `data` under `key` (record mode only), then enforce the size cap."""
+        if self.mode != "record":
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.evict()
+
+    def get_path(self, key, label="response"):
+        """
+        Like get(), but returns the entry's path so large recordings (Veo
+        renders) can be streamed instead of loaded into memory.
+        """
+        if self.mode == "off":
+            return None
+        path = self._path(key)
+        if not path.exists():
+            if self.mode == "replay":
+                raise CacheMiss(f"No recorded {label} for key {key[:12]}")
+            return None
+        os.utime(path)
+        print(f"↺ Using cached {label} ({key[:12]})")
+        return path
+
+    def put_file(self, key, source):
+        """Record a copy of the file at `source` (record mode only)."""
+        if self.mode != "record":
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, path)
+        self.evict()
+
+    def get_json(self, key, label="response"):
+        data = self.get(key, label)
+        return None if data is None else json.loads(data)
+
+    def put_json(self, key, value):
+        self.put(key, json.dumps(value).encode("utf-8"))
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*/*"):
+                if path.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide cache configured from the environment."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
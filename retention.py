@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Retention for posted_archive/, driven by a manifest.
+
+archive_manifest.json lists every archived video with its date, size,
+sha256 and the platforms it was posted to. post_script.py adds an entry when
+it archives a video. This tool reconciles the manifest with one listing of
+posted_archive/ (object-store pointers, plus any video files archived before
+the object store), then decides what to prune in a single pass:
+
+  - the newest ARCHIVE_KEEP_LAST videos are always kept
+  - anything older than ARCHIVE_MAX_AGE_DAYS (default 30) is pruned
+  - if the rest still exceeds ARCHIVE_MAX_MB, the oldest go until it fits
+
+Pruning a video removes its pointer, any local copy, and its object in the
+object store (object_store.py).
+
+Usage:
+  python3 retention.py            prune and update the manifest
+  python3 retention.py --dry-run  only report what would go and the bytes
+                                  reclaimed (or RETENTION_DRY_RUN=1)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import object_store
+
+ARCHIVE_DIR = Path("posted_archive")
+MANIFEST_FILE = Path("archive_manifest.json")
+DATE_IN_NAME = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Drain mode archives several videos at once
+_manifest_lock = threading.Lock()
+
+# Defaults for ARCHIVE_MAX_AGE_DAYS, ARCHIVE_MAX_MB and ARCHIVE_KEEP_LAST,
+# which plan() reads when it runs
+MAX_AGE_DAYS = 30
+# Total size the archive may keep (0 = no budget)
+MAX_MB = 0
+# Newest videos kept whatever their age or size (0 = none)
+KEEP_LAST = 0
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def video_date(filename, fallback):
+    """The date in a pip_YYYY-MM-DD filename, or `fallback` if there's none."""
+    match = DATE_IN_NAME.search(filename)
+    if match:
+        try:
+            return date.fromisoformat(match.group()).isoformat()
+        except ValueError:
+            pass
+    return fallback
+
+
+def load_manifest():
+    """
+    Returns:
+        dict: filename -> {"date", "size", "sha256", "posted", "posted_on",
+                           "archived_at"}
+    """
+    if MANIFEST_FILE.exists():
+        try:
+            return json.loads(MANIFEST_FILE.read_text())
+        except json.JSONDecodeError:
+            print(f"⚠️  {MANIFEST_FILE} is corrupt, rebuilding it from {ARCHIVE_DIR}/.")
+    return {}
+
+
+def save_manifest(manifest):
+    data = json.dumps(dict(sorted(manifest.items())), indent=2) + "\n"
+    fd, tmp = tempfile.mkstemp(dir=MANIFEST_FILE.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def record_archived(archive_path, entry=None):
+    """
+    Add a freshly archived video to the manifest.
+
+    Args:
+        archive_path: the video's path under posted_archive/
+        entry: its state-store entry, for the recorded size, sha256 and
+               posted platforms and days (hashed here if it has none)
+    """
+    entry = entry or {}
+    archive_path = Path(archive_path)
+    record = {
+        "date": video_date(archive_path.name, date.today().isoformat()),
+        "size": entry.get("size") or archive_path.stat().st_size,
+        "sha256": entry.get("sha256") or file_sha256(archive_path),
+        "posted": sorted(p for p, done in entry.get("posted", {}).items() if done),
+        # The UTC day of each post, so daily post limits still count it
+        "posted_on": {
+            p: done
+            for p, done in entry.get("posted", {}).items()
+            if isinstance(done, str)
+        },
+        "archived_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    with _manifest_lock:
+        manifest = load_manifest()
+        manifest[archive_path.name] = record
+        save_manifest(manifest)
+
+
+def sync(manifest):
+    """
+    Reconcile the manifest with posted_archive/: entries for vanished files
+    are dropped, files it doesn't know (archived before the manifest existed,
+    or by hand) are added. A file without a date in its name is dated the day
+    it's first seen, so it gets the full retention period rather than being
+    wrongly pruned.
+
+    Returns:
+        bool: whether the manifest changed
+    """
+    present = {path.name: path for path in object_store.list_videos(ARCHIVE_DIR)}
+    changed = False
+    for name in list(manifest):
+        if name not in present:
+            del manifest[name]
+            changed = True
+    today = date.today().isoformat()
+    for name, path in present.items():
+        if name in manifest:
+            continue
+        print(f"ℹ️  Adding {name} to {MANIFEST_FILE}")
+        pointer = object_store.read_pointer(path) or {
+            "size": path.stat().st_size,
+            "sha256": file_sha256(path),
+        }
+        manifest[name] = {
+            "date": video_date(name, today),
+            "size": pointer["size"],
+            "sha256": pointer["sha256"],
+            "posted": [],
+            "archived_at": None,
+        }
+        changed = True
+    return changed
+
+
+def plan(manifest, today=None, max_age_days=None, max_bytes=None, keep_last=None):
+    """
+    Decide which archived videos to prune. Limits not passed in come from
+    the environment.
+
+    Returns:
+        list: (filename, reason) pairs, oldest first
+    """
+    if max_age_days is None:
+        max_age_days = int(os.getenv("ARCHIVE_MAX_AGE_DAYS", MAX_AGE_DAYS))
+    if max_bytes is None:
+        max_bytes = int(float(os.getenv("ARCHIVE_MAX_MB", MAX_MB)) * 1024 * 1024)
+    if keep_last is None:
+        keep_last = int(os.getenv("ARCHIVE_KEEP_LAST", KEEP_LAST))
+    today = today or date.today()
+    cutoff = (today - timedelta(days=max_age_days)).isoformat()
+    # Oldest first; the filename breaks ties between same-day videos
+    ordered = sorted(manifest, key=lambda name: (manifest[name]["date"], name))
+    protected = set(ordered[-keep_last:]) if keep_last > 0 else set()
+
+    prune = []
+    kept = []
+    for name in ordered:
+        if name not in protected and manifest[name]["date"] < cutoff:
+            prune.append((name, f"older than {max_age_days} days"))
+        else:
+            kept.append(name)
+
+    if max_bytes > 0:
+        total = sum(manifest[name]["size"] for name in kept)
+        for name in list(kept):
+            if total <= max_bytes:
+                break
+            if name in protected:
+                continue
+            budget = max_bytes / 1024 / 1024
+            prune.append((name, f"over the {budget:.0f} MB budget"))
+            kept.remove(name)
+            total -= manifest[name]["size"]
+    return sorted(prune, key=lambda item: (manifest[item[0]]["date"], item[0]))
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv[1:] or os.getenv("RETENTION_DRY_RUN") == "1"
+    manifest = load_manifest()
+    changed = sync(manifest)
+
+    prune = plan(manifest)
+    reclaimed = sum(manifest[name]["size"] for name, _ in prune)
+    for name, reason in prune:
+        verb = "Would prune" if dry_run else "Pruning"
+        size = manifest[name]["size"] / 1e6
+        print(f"{verb} {name} ({manifest[name]['date']}, {size:.1f} MB): {reason}")
+    remaining = sum(entry["size"] for entry in manifest.values()) - reclaimed
+    summary = (
+        f"{len(prune)} of {len(manifest)} archived video(s), "
+        f"{reclaimed / 1e6:.1f} MB reclaimed, {remaining / 1e6:.1f} MB kept"
+    )
+
+    if dry_run:
+        print(f"Dry run: {summary}")
+        return
+    for name, _ in prune:
+        pointer = object_store.pointer_path(ARCHIVE_DIR / name)
+        if pointer.exists():
+            if not object_store.get_object_store().delete(manifest[name]["sha256"]):
+                continue  # keep the pointer so the next run retries
+            pointer.unlink()
+        (ARCHIVE_DIR / name).unlink(missing_ok=True)
+        del manifest[name]
+    if prune or changed:
+        save_manifest(manifest)
+    print(f"✓ Pruned {summary}")
+
+
+if __name__ == "__main__":
+    main()
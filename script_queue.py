@@ -0,0 +1,81 @@
+"""
+Queue of scripts written ahead of time by `generate_script.py --batch`.
+
+A batch run asks Gemini for a week of dated scripts in one request and appends
+them to script_queue.json. generate_video.py then takes the earliest one
+whenever there is no pending_script.json, so on most days the script stage is
+just a file move. A queued concept only enters the concept history (and the
+public episode log) on the day it is actually taken.
+"""
+
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+import history_store
+
+QUEUE_FILE = Path("script_queue.json")
+
+# Queued scripts planned for more than this many days ago are dropped: their
+# holiday/trend hook has passed
+STALE_AFTER_DAYS = 3
+
+
+def load_queue():
+    if QUEUE_FILE.exists():
+        try:
+            return json.loads(QUEUE_FILE.read_text())
+        except json.JSONDecodeError:
+            print("⚠️  script_queue.json is corrupt, starting fresh.")
+    return []
+
+
+def save_queue(queue):
+    queue = sorted(queue, key=lambda s: s.get("date", ""))
+    QUEUE_FILE.write_text(json.dumps(queue, indent=2) + "\n")
+
+
+def next_dates(queue, count, today=None):
+    """The `count` days after the last queued date (or after today)."""
+    today = today or date.today()
+    last = max((date.fromisoformat(s["date"]) for s in queue), default=today)
+    start = max(last, today) + timedelta(days=1)
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def take_next(today=None):
+    """
+    Remove and return the earliest queued script, or None if the queue is
+    empty. Stale entries are discarded on the way.
+    """
+    today = today or date.today()
+    queue = load_queue()
+    if not queue:
+        return None
+    queue.sort(key=lambda s: s.get("date", ""))
+    cutoff = (today - timedelta(days=STALE_AFTER_DAYS)).isoformat()
+    while queue and queue[0].get("date", "") < cutoff:
+        stale = queue.pop(0)
+        print(f"ℹ️  Dropping stale queued script for {stale['date']}: {stale['title']}")
+    script = queue.pop(0) if queue else None
+    save_queue(queue)
+    return script
+
+
+def record_in_history(script, key=("date",)):
+    """
+    Log a script's concept in the history under its date. Any existing entry
+    for that date (or matching on every field in `key`) is replaced, so a
+    same-day rerun doesn't create duplicates.
+
+    Returns:
+        int: the number of concepts in the history
+    """
+    return history_store.record(
+        {
+            "date": script["date"],
+            "concept_summary": script["concept_summary"],
+            "title": script["title"],
+        },
+        key=key,
+    )
@@ -0,0 +1,324 @@
+"""
+Transactional store for per-video state (title, caption, posted platforms,
+in-progress upload sessions), kept in SQLite in WAL mode.
+
+Every change is a small keyed transaction: marking one platform as posted or
+saving one upload session's offset touches a single row instead of rewriting
+the whole file. Writers in different threads or processes (generation and
+posting on the same machine) are serialized by SQLite, and a crash can't
+leave a half-written state behind.
+
+video_info.json is still what gets committed and read by humans, so it's kept
+as an export: written atomically by export_json() whenever a caller wants the
+durable copy brought up to date. When the store is opened and the JSON no
+longer matches the last export (a fresh checkout, or a commit from another
+machine), the JSON is imported and replaces the stored state.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Default location; STATE_DB overrides it when the store is opened
+DB_FILE = Path(".cache/state.db")
+VIDEO_INFO_FILE = Path("video_info.json")
+# Columns of their own; anything else in an entry is kept as JSON in `extra`
+ENTRY_FIELDS = ("title", "description", "size", "sha256")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    filename TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS posted (
+    filename TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    posted_on TEXT,
+    PRIMARY KEY (filename, platform)
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    filename TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    session TEXT NOT NULL,
+    PRIMARY KEY (filename, platform)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class StateCorrupt(Exception):
+    """video_info.json is unreadable and there is no stored state to fall back on."""
+
+
+def utc_today():
+    """Today's date (UTC) in ISO format, the day a post is recorded under."""
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class StateStore:
+    def __init__(self, path=None, json_path=VIDEO_INFO_FILE):
+        self.path = Path(path or os.getenv("STATE_DB") or DB_FILE)
+        self.json_path = Path(json_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the posting threads, serialized by _lock;
+        # other processes are kept in line by SQLite's own locking
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posted)")}
+        if "posted_on" not in columns:
+            # A store from before posted dates were kept
+            self._conn.execute("ALTER TABLE posted ADD COLUMN posted_on TEXT")
+        self._lock = threading.RLock()
+        self._import_if_changed()
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        row = row.fetchone()
+        return row[0] if row else None
+
+    def _import_if_changed(self):
+        """
+        Load video_info.json when it differs from what this store last
+        exported or imported. The JSON wins: it's what was committed.
+
+        Raises:
+            StateCorrupt: if the JSON is unreadable and the store is empty
+        """
+        try:
+            raw = self.json_path.read_bytes()
+        except FileNotFoundError:
+            return
+        digest = _digest(raw)
+        with self._transaction() as conn:
+            if self._meta("json_sha256") == digest:
+                return
+            try:
+                data = json.loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("top level is not an object")
+            except ValueError as e:
+                stored = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+                if not stored:
+                    raise StateCorrupt(
+                        f"{self.json_path} is corrupt ({e}) and there is no "
+                        f"stored state in {self.path}; fix or restore it from git."
+                    )
+                print(
+                    f"⚠️  {self.json_path} is corrupt ({e}); keeping the "
+                    f"{stored} entries in {self.path}."
+                )
+                return
+            for table in ("videos", "posted", "uploads"):
+                conn.execute(f"DELETE FROM {table}")
+            for filename, entry in data.items():
+                self._write_entry(conn, filename, entry)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('json_sha256', ?)", (digest,)
+            )
+        print(f"✓ Loaded {len(data)} video entries from {self.json_path}")
+
+    def _write_entry(self, conn, filename, entry):
+        extra = {
+            k: v
+            for k, v in entry.items()
+            if k not in ENTRY_FIELDS and k not in ("posted", "uploads")
+        }
+        conn.execute(
+            "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?)",
+            (filename, *(entry.get(k) for k in ENTRY_FIELDS), json.dumps(extra)),
+        )
+        conn.execute("DELETE FROM posted WHERE filename = ?", (filename,))
+        conn.execute("DELETE FROM uploads WHERE filename = ?", (filename,))
+        # "posted" maps a platform to the UTC day it was posted (True in
+        # entries from before the day was recorded)
+        conn.executemany(
+            "INSERT INTO posted VALUES (?, ?, ?)",
+            [
+                (filename, p, done if isinstance(done, str) else None)
+                for p, done in entry.get("posted", {}).items()
+                if done
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO uploads VALUES (?, ?, ?)",
+            [
+                (filename, p, json.dumps(session))
+                for p, session in entry.get("uploads", {}).items()
+                if session
+            ],
+        )
+
+    def _read_entries(self, filename=None):
+        where, args = ("WHERE filename = ?", (filename,)) if filename else ("", ())
+        entries = {}
+        for row in self._conn.execute(
+            f"SELECT filename, title, description, size, sha256, extra "
+            f"FROM videos {where} ORDER BY filename",
+            args,
+        ):
+            entry = {k: v for k, v in zip(ENTRY_FIELDS, row[1:5]) if v is not None}
+            entry.update(json.loads(row[5]))
+            entries[row[0]] = entry
+        for name, platform, posted_on in self._conn.execute(
+            f"SELECT filename, platform, posted_on FROM posted {where}", args
+        ):
+            if name in entries:
+                entries[name].setdefault("posted", {})[platform] = posted_on or True
+        for name, platform, session in self._conn.execute(
+            f"SELECT filename, platform, session FROM uploads {where}", args
+        ):
+            if name in entries:
+                entries[name].setdefault("uploads", {})[platform] = json.loads(session)
+        return entries
+
+    def entry(self, filename):
+        """
+        A video's state in the video_info.json shape, or None.
+
+        Returns:
+            dict: {"title", "description", ..., "posted": {}, "uploads": {}}
+        """
+        with self._transaction():
+            return self._read_entries(filename).get(filename)
+
+    def entries(self):
+        """Every video's state, keyed by filename."""
+        with self._transaction():
+            return self._read_entries()
+
+    def put_entry(self, filename, entry):
+        """Create or replace a video's whole entry (posted/uploads included)."""
+        with self._transaction() as conn:
+            self._write_entry(conn, filename, entry)
+
+    def delete_entry(self, filename):
+        """
+        Returns:
+            bool: whether there was an entry to delete
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM videos WHERE filename = ?", (filename,))
+            conn.execute("DELETE FROM posted WHERE filename = ?", (filename,))
+            conn.execute("DELETE FROM uploads WHERE filename = ?", (filename,))
+            return cursor.rowcount > 0
+
+    def mark_posted(self, filename, platform):
+        """
+        Record a platform as done (on today's UTC date) and drop its
+        now-finished upload session.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO posted VALUES (?, ?, ?)",
+                (filename, platform, utc_today()),
+            )
+            conn.execute(
+                "DELETE FROM uploads WHERE filename = ? AND platform = ?",
+                (filename, platform),
+            )
+
+    def posted_counts(self, day):
+        """
+        Returns:
+            dict: platform -> number of videos posted to it on `day` (UTC)
+        """
+        with self._transaction() as conn:
+            return dict(
+                conn.execute(
+                    "SELECT platform, COUNT(*) FROM posted WHERE posted_on = ? "
+                    "GROUP BY platform",
+                    (day,),
+                )
+            )
+
+    def save_upload(self, filename, platform, session):
+        """Persist one platform's upload session; an empty one is removed."""
+        with self._transaction() as conn:
+            if session:
+                conn.execute(
+                    "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?)",
+                    (filename, platform, json.dumps(dict(session))),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM uploads WHERE filename = ? AND platform = ?",
+                    (filename, platform),
+                )
+
+    def export_json(self):
+        """
+        Atomically rewrite video_info.json from the store (only if it changed),
+        and remember its hash so the next open doesn't re-import it.
+        """
+        with self._lock:
+            data = (json.dumps(self.entries(), indent=2) + "\n").encode("utf-8")
+            digest = _digest(data)
+            if self._meta("json_sha256") == digest and self.json_path.exists():
+                return
+            fd, tmp = tempfile.mkstemp(dir=self.json_path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.json_path)
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('json_sha256', ?)", (digest,)
+                )
+        print(f"✓ Exported {self.json_path}")
+
+
+class _Transaction:
+    """`with store._transaction() as conn:` — an immediate-mode transaction."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.store._conn.execute("BEGIN IMMEDIATE")
+        return self.store._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.store._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store._lock.release()
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store, migrated from video_info.json on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+        return _store
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import history_store
+import novelty
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def index_before(day, monkeypatch):
+    """An index over the committed history entries dated before `day`."""
+    monkeypatch.chdir(ROOT)
+    history = history_store.read_all()
+    index = novelty.NoveltyIndex()
+    index.set_extra([e for e in history if e["date"] < day])
+    return index, {e["date"]: e for e in history}
+
+
+def test_known_repeat_is_rejected(monkeypatch):
+    # 07-25's squishy boba fidget toy that bulges and erupts repeats 07-10's
+    # and 07-12's squishy fidget toys
+    index, history = index_before("2026-07-25", monkeypatch)
+    is_novel, near = index.check(history["2026-07-25"]["concept_summary"])
+    assert not is_novel
+    assert {entry["date"] for _, entry in near[:2]} == {"2026-07-10", "2026-07-12"}
+
+
+def test_synonyms_match_a_differently_worded_repeat(monkeypatch):
+    index, _ = index_before("2026-07-25", monkeypatch)
+    is_novel, near = index.check(
+        "Pip presses a squishy NeeDoh stress ball in the Mystical Press, which "
+        "bulges and then pops in a burst of glitter."
+    )
+    assert not is_novel
+    assert near[0][1]["date"] in ("2026-07-10", "2026-07-12")
+
+
+def test_distinct_concept_is_novel(monkeypatch):
+    index, history = index_before("2026-08-20", monkeypatch)
+    is_novel, _ = index.check(history["2026-08-20"]["concept_summary"])
+    assert is_novel
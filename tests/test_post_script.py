@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("googleapiclient")
+pytest.importorskip("requests")
+
+import post_script  # noqa: E402
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def default_chunk_size(monkeypatch):
+    monkeypatch.setattr(post_script, "UPLOAD_CHUNK_SIZE", 8 * MB)
+
+
+@pytest.mark.parametrize(
+    "video_size", [1, 5 * MB - 1, 5 * MB, 6 * MB, 8 * MB - 1, 8 * MB]
+)
+def test_tiktok_chunk_plan_single_chunk_up_to_chunk_size(video_size):
+    # TikTok counts floor(video_size / chunk_size) chunks, so a chunk bigger
+    # than the video would be counted as zero chunks and rejected
+    assert post_script.tiktok_chunk_plan(video_size) == (video_size, 1)
+
+
+def test_tiktok_chunk_plan_merges_remainder_into_last_chunk():
+    assert post_script.tiktok_chunk_plan(20 * MB) == (8 * MB, 2)
+
+
+def test_tiktok_chunk_plan_never_exceeds_video_size():
+    for video_size in range(4 * MB, 20 * MB, 512 * 1024):
+        chunk_size, count = post_script.tiktok_chunk_plan(video_size)
+        assert chunk_size <= video_size
+        assert count == video_size // chunk_size >= 1
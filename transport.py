@@ -0,0 +1,176 @@
+"""
+Shared HTTP transport for every Graph API, TikTok and GitHub call.
+
+One pooled requests.Session keeps connections alive per host, so the dozens of
+status polls in a posting run reuse a single TCP+TLS connection instead of
+handshaking every time. Every call gets a timeout, transient failures
+(connection resets, 429, 5xx) are retried with jittered exponential backoff,
+and each request's latency is recorded for the end-of-run summary.
+
+Retries are idempotency-aware: GET/PUT/DELETE/HEAD are retried on any
+transient failure, but a POST is only retried when the caller marks it
+idempotent (e.g. an offset-addressed upload chunk) or when the failure proves
+the request never reached the server.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 60)
+UPLOAD_TIMEOUT = (10, 300)
+
+# Attempts per request; HTTP_MAX_ATTEMPTS overrides it (read per request, so
+# a value from the calling script's .env applies)
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+POOL_SIZE = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+_session = None
+_session_lock = threading.Lock()
+_latencies = []
+_latencies_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a server's Retry-After."""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+    cap = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, cap)
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _record(method, url, status, seconds):
+    with _latencies_lock:
+        _latencies.append((method, urlsplit(url).netloc, status, seconds))
+
+
+def request(method, url, *, timeout=None, idempotent=None, attempts=None, **kwargs):
+    """
+    Send a request through the shared session with timeout and retries.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        timeout: (connect, read) timeout; defaults to DEFAULT_TIMEOUT
+        idempotent: Override whether the call is safe to repeat; defaults to
+            True for GET/PUT/DELETE/HEAD/OPTIONS and False otherwise
+        attempts: Override HTTP_MAX_ATTEMPTS for this call
+        **kwargs: Passed straight to requests (params, headers, json, data...)
+
+    Returns:
+        requests.Response: the final response (which may still be an error
+        status once retries are exhausted — callers check it as before)
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    attempts = attempts or int(os.getenv("HTTP_MAX_ATTEMPTS", MAX_ATTEMPTS))
+    session = get_session()
+    # A file body is consumed by each attempt: rewind it before a retry
+    body = kwargs.get("data")
+    body_start = body.tell() if hasattr(body, "seek") else None
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        if attempt and body_start is not None:
+            body.seek(body_start)
+        start = time.monotonic()
+        try:
+            response = session.request(
+                method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _record(method, url, type(e).__name__, time.monotonic() - start)
+            # A connect timeout means nothing was sent, so even a POST is safe
+            retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            if last_attempt or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            print(
+                f"⚠️  {method} {urlsplit(url).netloc} failed ({e}); "
+                f"retrying in {delay:.1f}s..."
+            )
+            time.sleep(delay)
+            continue
+
+        _record(method, url, response.status_code, time.monotonic() - start)
+        # 429 means the server refused the request outright, so it is safe
+        # to repeat regardless of method
+        retryable = response.status_code == 429 or (
+            idempotent and response.status_code in RETRY_STATUSES
+        )
+        if last_attempt or not retryable:
+            return response
+        delay = backoff_delay(attempt, _retry_after_seconds(response))
+        print(
+            f"⚠️  {method} {urlsplit(url).netloc} returned {response.status_code}; "
+            f"retrying in {delay:.1f}s..."
+        )
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+def print_latency_summary():
+    """Print request count and latency per host for everything sent so far."""
+    with _latencies_lock:
+        records = list(_latencies)
+    if not records:
+        return
+    by_host = {}
+    for _, host, _, seconds in records:
+        by_host.setdefault(host, []).append(seconds)
+    print("HTTP latency summary:")
+    for host, samples in sorted(by_host.items()):
+        samples.sort()
+        p50 = samples[len(samples) // 2]
+        print(
+            f"  {host}: {len(samples)} request(s), p50 {p50 * 1000:.0f} ms, "
+            f"max {samples[-1] * 1000:.0f} ms, total {sum(samples):.1f}s"
+        )
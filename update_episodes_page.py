@@ -1,17 +1,17 @@
 #!/usr/bin/env python3
 """
-Regenerate docs/episodes.html from content_history.json.
+Regenerate docs/episodes.html from the concept history (history/).
 
 Runs in the daily generation workflow after the script is written, so the
 public website's episode log stays current forever with zero maintenance.
 """
 
 import html
-import json
 from datetime import datetime
 from pathlib import Path
 
-HISTORY_FILE = Path("content_history.json")
+import history_store
+
 OUTPUT_FILE = Path("docs/episodes.html")
 
 PAGE_TEMPLATE = """<!DOCTYPE html>
@@ -57,7 +57,7 @@ def pretty_date(iso_date):
 
 
 def main():
-    history = json.loads(HISTORY_FILE.read_text()) if HISTORY_FILE.exists() else []
+    history = history_store.read_all()
 
     cards = [
         EPISODE_TEMPLATE.format(
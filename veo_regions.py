@@ -0,0 +1,347 @@
+"""
+Multi-region Veo generation with failover and hedging.
+
+Veo jobs are submitted to the first location in VEO_LOCATIONS. A quota or
+availability error (on submission or as the job's result) fails over to the
+next location straight away. A job that is merely slow gets a hedge: once
+the newest job has run VEO_HEDGE_AFTER_SECONDS without finishing, the same
+request is also submitted to the next location. Whichever job finishes first
+wins and the rest are cancelled (or, where the SDK can't cancel, abandoned).
+
+Jobs are polled through polling.Poller: each request's operations, plus a
+timer for its next hedge, are added to a poller, and RegionalJob.handle()
+makes the hedge and failover decisions as their results come in. Several
+requests can share one poller, so buffer mode drives all of its jobs from a
+single thread.
+
+Clients come from a client_factory(location) callable, so the policy can be
+exercised against a local stand-in client without touching Vertex AI.
+"""
+
+import itertools
+import os
+import time
+
+import polling
+
+# Errors that mean "this region can't take the job right now"
+CAPACITY_HTTP_CODES = {429, 503}
+CAPACITY_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE")
+# google.rpc codes in a finished operation's error
+CAPACITY_RPC_CODES = {8, 14}
+
+# Defaults for VEO_HEDGE_AFTER_SECONDS and VEO_MAX_PARALLEL_REGIONS, which
+# (like VEO_LOCATIONS) are read when a RegionalJob is created.
+# An 8-second clip usually lands in 1-3 minutes; past this, hedge elsewhere
+HEDGE_AFTER_SECONDS = 300
+# Jobs allowed in flight at once for one request (primary + hedges)
+MAX_PARALLEL = 2
+
+
+def configured_locations():
+    """
+    VEO_LOCATIONS in order; defaults (also when set empty) to the single
+    GOOGLE_CLOUD_LOCATION.
+    """
+    spec = os.getenv("VEO_LOCATIONS") or os.getenv(
+        "GOOGLE_CLOUD_LOCATION", "us-central1"
+    )
+    return [loc.strip() for loc in spec.split(",") if loc.strip()]
+
+
+def is_capacity_error(error):
+    """Whether an exception or operation error means the region is saturated."""
+    if isinstance(error, dict):
+        return error.get("code") in CAPACITY_RPC_CODES
+    code = getattr(error, "code", None)
+    if code in CAPACITY_HTTP_CODES:
+        return True
+    text = str(error)
+    return any(status in text for status in CAPACITY_STATUSES)
+
+
+class RegionalJob:
+    """One request's Veo jobs across regions."""
+
+    def __init__(
+        self,
+        client_factory,
+        submit,
+        locations=None,
+        hedge_after=None,
+        max_parallel=None,
+        poll_policy=None,
+        on_change=None,
+        attach=None,
+    ):
+        """
+        Args:
+            client_factory: location -> genai client
+            submit: client -> new operation for this request
+            locations: ordered locations to use (defaults to VEO_LOCATIONS)
+            hedge_after: seconds before a slow job is hedged in the next region
+                (defaults to VEO_HEDGE_AFTER_SECONDS)
+            max_parallel: cap on concurrent jobs for this request (defaults
+                to VEO_MAX_PARALLEL_REGIONS)
+            poll_policy: polling.PollPolicy for status checks and the deadline
+            on_change: called with [{"name", "location"}] whenever the set of
+                live jobs changes, so it can be checkpointed
+            attach: (client, operation name) -> operation, for resuming
+
+        Raises:
+            ValueError: if there is no location to submit to
+        """
+        self.client_factory = client_factory
+        self.submit = submit
+        self.locations = list(locations or configured_locations())
+        if not self.locations:
+            raise ValueError("No Veo locations configured (VEO_LOCATIONS)")
+        if hedge_after is None:
+            hedge_after = float(
+                os.getenv("VEO_HEDGE_AFTER_SECONDS", HEDGE_AFTER_SECONDS)
+            )
+        if max_parallel is None:
+            max_parallel = int(os.getenv("VEO_MAX_PARALLEL_REGIONS", MAX_PARALLEL))
+        self.hedge_after = hedge_after
+        self.max_parallel = max(1, max_parallel)
+        self.policy = poll_policy or polling.PollPolicy(60, 10, 30, timeout=1200)
+        self.on_change = on_change
+        self.attach = attach
+        self._clients = {}
+        self._live = []  # dicts: location, client, operation, key
+        self._untried = list(self.locations)
+        self._last_launch = None
+        self._last_error_op = None
+        self._poller = None
+        self._started = None
+        self._deadline = None
+        # Poller keys are (job, tag) pairs, so a shared poller's results can
+        # be routed back to their RegionalJob with key[0]
+        self._tags = itertools.count()
+        self._hedge_key = (self, "hedge")
+
+    def client(self, location):
+        if location not in self._clients:
+            self._clients[location] = self.client_factory(location)
+        return self._clients[location]
+
+    def _track(self, location, operation):
+        job = {
+            "location": location,
+            "client": self.client(location),
+            "operation": operation,
+            "key": (self, next(self._tags)),
+        }
+        self._live.append(job)
+        self._last_launch = time.monotonic()
+        if self._poller is not None:
+            self._schedule(job)
+            self._schedule_hedge()
+        self._changed()
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(
+                [
+                    {"name": job["operation"].name, "location": job["location"]}
+                    for job in self._live
+                ]
+            )
+
+    def _check(self, job):
+        job["operation"] = job["client"].operations.get(job["operation"])
+        if job["operation"].done:
+            return job["operation"]
+        print(
+            f"  ...still generating in {job['location']} "
+            f"({int(time.monotonic() - self._started)}s elapsed)"
+        )
+        return None
+
+    def _schedule(self, job):
+        # Every job of the request shares the request's deadline
+        remaining = max(0.0, self._deadline - time.monotonic())
+        self._poller.add(
+            job["key"],
+            lambda: self._check(job),
+            self.policy._replace(timeout=remaining),
+        )
+
+    def _schedule_hedge(self):
+        """(Re)arm the hedge timer for the newest job, if a hedge is allowed."""
+        self._poller.discard(self._hedge_key)
+        if not self._untried or len(self._live) >= self.max_parallel:
+            return
+        hedge_at = self._last_launch + self.hedge_after
+        if hedge_at >= self._deadline:
+            return
+        delay = max(0.0, hedge_at - time.monotonic())
+        self._poller.add(
+            self._hedge_key,
+            lambda: True,
+            polling.PollPolicy(delay, delay, delay, jitter=0, timeout=delay),
+        )
+
+    def _abandon(self):
+        """Stop polling every job of this request."""
+        for job in self._live:
+            self._poller.discard(job["key"])
+        self._poller.discard(self._hedge_key)
+
+    def resume(self, records):
+        """Re-attach to jobs a previous run submitted ({"name", "location"})."""
+        for record in records:
+            location = record.get("location") or self.locations[0]
+            if location in self._untried:
+                self._untried.remove(location)
+            print(f"↷ Resuming Veo operation in {location}: {record['name']}")
+            operation = self.attach(self.client(location), record["name"])
+            self._track(location, operation)
+
+    def launch(self):
+        """
+        Submit the request to the next untried location, skipping past any
+        that refuse it for capacity reasons.
+
+        Returns:
+            bool: whether a job was started
+        """
+        last_error = None
+        while self._untried:
+            location = self._untried.pop(0)
+            try:
+                operation = self.submit(self.client(location))
+            except Exception as e:
+                if not is_capacity_error(e):
+                    raise
+                last_error = e
+                print(f"⚠️  Veo in {location} refused the job ({e}), failing over...")
+                continue
+            print(f"✓ Submitted Veo job in {location}: {operation.name}")
+            self._track(location, operation)
+            return True
+        if last_error and not self._live:
+            raise last_error
+        return False
+
+    def _cancel_others(self, winner):
+        if self._live == [winner]:
+            return
+        for job in self._live:
+            if job is winner:
+                continue
+            if self._poller is not None:
+                self._poller.discard(job["key"])
+            cancel = getattr(job["client"].operations, "cancel", None)
+            try:
+                if cancel:
+                    cancel(job["operation"])
+                    print(f"✓ Cancelled slower Veo job in {job['location']}")
+                else:
+                    print(f"ℹ️  Abandoning slower Veo job in {job['location']}")
+            except Exception as e:
+                print(f"⚠️  Could not cancel Veo job in {job['location']}: {e}")
+        self._live = [winner]
+        self._changed()
+
+    def start(self, poller):
+        """
+        Start polling this request's jobs on `poller`: the resumed ones, or a
+        fresh submission if there are none. The deadline counts from here.
+
+        Raises:
+            RuntimeError: if no job could be started or resumed at all
+        """
+        self._poller = poller
+        self._started = time.monotonic()
+        self._deadline = self._started + self.policy.timeout
+        if self._live:
+            self._last_launch = self._started
+            for job in self._live:
+                self._schedule(job)
+            self._schedule_hedge()
+        else:
+            self.launch()
+        if not self._live:
+            raise RuntimeError(
+                "No Veo job to run: every location was already tried "
+                f"({', '.join(self.locations)})"
+            )
+
+    def handle(self, key, result, error):
+        """
+        Act on one of this request's results from the poller: hedge when the
+        timer fires, fail over when a region runs out of capacity, or pick
+        the winner (cancelling the rest).
+
+        Returns:
+            tuple: (location, client, finished operation) once the request is
+                   settled, else None — the operation may still carry a
+                   non-capacity error for the caller to report, or be the
+                   last capacity failure if every region ran out
+
+        Raises:
+            polling.PollTimeout: if nothing finished before the deadline
+            Exception: whatever a status check or resubmission raised
+        """
+        try:
+            outcome = self._handle(key, result, error)
+        except BaseException:
+            self._abandon()
+            raise
+        if outcome is not None:
+            self._abandon()
+        return outcome
+
+    def _handle(self, key, result, error):
+        now = time.monotonic()
+        if key == self._hedge_key:
+            print(
+                f"ℹ️  No Veo result after {int(now - self._last_launch)}s, "
+                "hedging in another region..."
+            )
+            self.launch()
+            return None
+        job = next(j for j in self._live if j["key"] == key)
+        if isinstance(error, polling.PollTimeout):
+            raise polling.PollTimeout(
+                f"Veo still generating after {int(now - self._started)}s in "
+                f"{', '.join(j['location'] for j in self._live)}"
+            )
+        if error:
+            raise error
+
+        operation = result
+        if operation.error and is_capacity_error(operation.error):
+            print(f"⚠️  Veo in {job['location']} ran out of capacity, failing over...")
+            self._live.remove(job)
+            self._changed()
+            self._last_error_op = (job["location"], job["client"], operation)
+            if not self._live:
+                self.launch()
+            if not self._live:
+                # Every region ran out of capacity; report the last failure
+                return self._last_error_op
+            self._schedule_hedge()
+            return None
+        self._cancel_others(job)
+        return job["location"], job["client"], operation
+
+    def run(self):
+        """
+        Drive the jobs on a poller of their own until one finishes.
+
+        Returns:
+            tuple: (location, client, finished operation) — see handle()
+
+        Raises:
+            polling.PollTimeout: if nothing finished before the deadline
+            RuntimeError: if no job could be started or resumed at all
+        """
+        poller = polling.Poller()
+        self.start(poller)
+        for key, result, error in poller:
+            outcome = self.handle(key, result, error)
+            if outcome is not None:
+                return outcome
+        raise RuntimeError("Veo jobs stopped being polled before one finished")